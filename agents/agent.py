@@ -1,12 +1,15 @@
 import os
-import sqlite3
+import threading
+import time
+from collections import OrderedDict
 
-from langchain_openai import ChatOpenAI
 from langgraph_supervisor import create_supervisor
 from agents.package_detals.agent import agent_policy_package_details
 from agents.spreadsheet.spreadsheet_agent import agent_spreadsheet_data
-from langgraph.checkpoint.sqlite import SqliteSaver
-from agents.notification_helper import format_notifications_for_prompt
+from agents.checkpointer import get_checkpointer
+from agents.history_policy import SupervisorState, make_history_hook
+from agents.llm_clients import get_chat_model
+from agents.notification_helper import format_notifications_for_prompt, notification_version
 
 
 from dotenv import load_dotenv
@@ -17,7 +20,8 @@ load_dotenv()
 openai_key = os.getenv("OPENAI_API_KEY")
 print(openai_key)
 # setting up LLM
-llm = ChatOpenAI(model='gpt-4o',temperature=0.2,api_key=openai_key)
+# Shared, connection-pooled model (see agents/llm_clients.py)
+llm = get_chat_model('gpt-4o', temperature=0.2)
 
 # config checkpoint
 
@@ -35,17 +39,15 @@ llm = ChatOpenAI(model='gpt-4o',temperature=0.2,api_key=openai_key)
 
 
 
-conn = sqlite3.connect("database/suhail_database.db",check_same_thread=False)
+# Shared checkpointer (see agents/checkpointer.py for backend selection)
+memory = get_checkpointer()
 
-memory = SqliteSaver(conn)
-
-def get_supervisor_prompt(user_id=None):
-    notifications = format_notifications_for_prompt(user_id=user_id)
-    prompt_template = f'''
+# Static part of the client supervisor prompt. It is identical for every user and request,
+# so it forms a stable prefix that OpenAI's automatic prompt caching can reuse; anything
+# per-user goes into the suffix built by get_supervisor_prompt(). Keep it that way.
+SUPERVISOR_PROMPT_PREFIX = '''
 First introduction message MUST be displayed in BOTH arabic and english, regardless of user input.
 
-Current team notifications status: {notifications}
-
 You are a supervisory agent for Suhail Insurance with access to specialized agents and their tools. You have access to current team notifications that may be relevant during the conversation. DO NOT mention notifications immediately. Instead, monitor user inputs and inject notification highlights ONLY when contextually relevant.
 
 **Notification Handling Logic:**
@@ -54,7 +56,7 @@ You are a supervisory agent for Suhail Insurance with access to specialized agen
   - Package (Basic, Bronze, Silver, Gold, Diamond)
   - Benchmarks, Claims, Loss Ratio discussions
 - If a notification matches this context, present it as a **Smart Notice** with a subtle professional tone along with the response.
-- Example insertion: "Based on a recent management notice regarding {{matching_context}}, this could influence your offer strategy."
+- Example insertion: "Based on a recent management notice regarding {matching_context}, this could influence your offer strategy."
 - Do NOT derail the flow or ask follow-up questions after sharing a notification, simply inject it into the response when suitable. Continue with the planned steps seamlessly.
 
 These are the tools you have access to:
@@ -93,8 +95,8 @@ For these inputs, request them from the user in a friendly manner and dont provi
 ❌ **DO NOT proceed with any analysis, tool usage, or recommendations until ALL 7 inputs are collected and validated.**
 ✅ **Only after collecting all 7 VALID inputs, use the assess_new_offer tool to get benchmark data, then use that data to build comprehensive comparison tables and recommendations.**
 
-{{
-  "prompt": {{
+{
+  "prompt": {
     "instructions": [
       "You only handle **health insurance** inquiries. Politely decline all others. If user asks a question about relevant financials, or cost per claim, you MUST answer.",
       "Ask the user whether this business opportunity is a **New Business** or a **Renewal**.",
@@ -104,24 +106,24 @@ For these inputs, request them from the user in a friendly manner and dont provi
       "As soon as the company name is received, call the Enriched Google Search tool. Do NOT summarize its results. Instead, extract a one-liner about what the company does, and highlight any recent relevant news (e.g., expansions, funding, market changes). Use the information gathered smartly throughout rest of conversation.",
       "Always populate all table values (no TBDs). Do not ask the user to continue once you have the necessary inputs — proceed immediately."
     ],
-    "introduction": {{
+    "introduction": {
       "Arabic_message": "👋 مرحباً، أنا سهيل، مساعدك الذكي لمبيعات التأمين الصحي. يمكنني مساعدتك في إعداد عروض الأعمال الجديدة، دعم تجديد وثيقتك، أو مقارنة مزايا الباقات لاستعمالها في اجتماعاتك مع العملاء. هل ترغب بالمتابعة باللغة العربية أم الإنجليزية؟",
       "english_message": "👋 Hi, I am Suhail, your smart digital sales assistant. I can help you compile sales offers for your new business offerings, support in the renewal of your policy, or simply compare for you the product benefits to use it in your meetings with clients. Would you like to continue in Arabic or English?"
-    }},
-    "context": {{
+    },
+    "context": {
       "company_name": "Company Name (English | Arabic)",
-      "real_world_company_insights": "{{EnrichedGoogleSearch(company_name)}}"
-    }},
+      "real_world_company_insights": "{EnrichedGoogleSearch(company_name)}"
+    },
     "steps": [
-      {{
+      {
         "step": "Step 1",
         "inputs": [
           "Contract Region (e.g. Central, Eastern, Western)",
           "Number of Lives (Earned Exposure)",
           "Offered Budget per Life (in SAR)"
         ]
-      }},
-      {{
+      },
+      {
         "step": "Step 2",
         "inputs": [
           "Target Loss Ratio (e.g. 85%)",
@@ -129,27 +131,27 @@ For these inputs, request them from the user in a friendly manner and dont provi
           "Historical Claims per Life (say 'I don’t know' if unavailable)",
           "Expected Client Inception Date (YYYY-MM-DD)"
         ]
-      }}
+      }
     ],
-    "simulation_logic": {{
+    "simulation_logic": {
       "Benchmarking": "Compare group size and budget with regional package-specific book using ±15% tolerance",
-      "Pre-Simulation Check": {{
+      "Pre-Simulation Check": {
         "Action": "After collecting all 7 inputs, display a structured summary of inputs versus regional benchmark averages in a clear table.",
         "Benchmark Comparison": "Show whether number of lives and budget are within expected ranges without showing ±15% threshold to the user."
-      }},
+      },
       "Required Premium": "Use target LR and add 5% contingency",
       "Expected Loss Ratio": "Use package-specific average claims per life from the same region",
-      "Probability Calculation": {{
+      "Probability Calculation": {
         "Base": "60% logistic regression + 40% similarity score",
         "Adjustment": "Multiply final result by 60%",
         "Penalty": "If required price exceeds budget, reduce probability proportionally",
         "Bonus": "If expected LR ≤ target LR and no budget penalty applied, increase probability by 5%",
         "Exclusivity": "Apply either penalty or bonus, never both"
-      }},
+      },
       "Claims Fallback": "If historical claims per life are unknown, use regional package-specific average",
       "Fallback Package Logic": "If main package doesn’t fit, MUST recommend next best-fitting package automatically, either alternative or fallback",
       "Comparison Logic": "Always show Option 1 (best-fit) vs Option 2 (fallback or alternative) in a table format",
-      "Display Rules": {{
+      "Display Rules": {
         "Never Show": ["Calculation formulas", "Penalty", "Bonus"],
         "Always Recommend": "Higher coverage if both packages fit budget",
         "Fallback Package": "Only shown if needed or for negotiation prep",
@@ -163,10 +165,10 @@ For these inputs, request them from the user in a friendly manner and dont provi
           "Show prices in SAR with thousands separator",
           "Show percentages with one decimal place"
         ]
-      }}
-    }},
+      }
+    },
     For output , make sure all values are CONSISTENT, dont have any contradictions.
-    "output_format": {{
+    "output_format": {
       "sections": [
         "Markdown Table: Benchmark Comparison Table: Requested package vs Regional Average for number of lives, offered budger per life and target loss ratio for requested package",
         "Markdown Table: Side-by-side Comparison Table: Requested package vs fallback and/ or alternative package. Never display N/A.",
@@ -180,27 +182,76 @@ For these inputs, request them from the user in a friendly manner and dont provi
         "Predicted Sale Probability"
       ],
       "how_to_pitch_it": "Tailor this sales pitch using real-time company context if available.. Act as a senior advisor with deep domain understanding. Use company insights not just to restate facts, but to **infer strategic priorities**. Begin with **only a brief reference to the company’s positioning if it directly affects the decision** (e.g., recent expansion → more coverage). Avoid repeating summaries already mentioned earlier.\\n\\nFocus instead on articulating why a particular package meets the company’s current **growth stage**, **employee profile**, and **financial risk appetite**. Speak in the tone of a professional consultant preparing a pitch for senior decision-makers. End with negotiation-ready reasoning that addresses objections and highlights tradeoffs clearly."
-    }}
-  }}
-}}
+    }
+  }
+}
 '''
-    return prompt_template
+
+def get_supervisor_prompt(user_id=None):
+    notifications = format_notifications_for_prompt(user_id=user_id)
+    # Dynamic suffix: changes per user and whenever notifications change
+    return f"""{SUPERVISOR_PROMPT_PREFIX}
+**Current team notifications status** (see Notification Handling Logic above):
+{notifications}
+"""
 
 def create_agent_supervisor(user_id=None):
     if not user_id:
         raise ValueError("user_id is required to create a supervisor agent")
     
+    prompt = get_supervisor_prompt(user_id)
     supervisor = create_supervisor(
         agents=[agent_policy_package_details(llm=llm), agent_spreadsheet_data(llm=llm)],
         model=llm,
-        prompt=get_supervisor_prompt(user_id),
-        output_mode="last_message"
+        prompt=prompt,
+        output_mode="last_message",
+        # Only recent turns plus a rolling summary are sent to the model (agents/history_policy.py)
+        pre_model_hook=make_history_hook(llm, prompt),
+        state_schema=SupervisorState
     )
     return supervisor.compile(checkpointer=memory)
 
+# Compiled supervisors are cached per user so a warm client chat skips graph construction
+# and the notifications lookup. Entries expire after a TTL and are evicted LRU-first once
+# the cache is full; an entry built for an older notification version is rebuilt.
+SUPERVISOR_CACHE_MAX_SIZE = int(os.getenv("SUPERVISOR_CACHE_MAX_SIZE", "256"))
+SUPERVISOR_CACHE_TTL_SECONDS = float(os.getenv("SUPERVISOR_CACHE_TTL_SECONDS", "900"))
+
+_supervisor_cache = OrderedDict()  # user_id -> (created_at, notification version, compiled supervisor)
+_supervisor_cache_lock = threading.Lock()
+
 # Function to get a supervisor agent for a specific user
 def get_supervisor_for_user(user_id):
-    return create_agent_supervisor(user_id=user_id)
+    key = str(user_id)
+    now = time.monotonic()
+    # Read before building: a change during the build leaves the entry stale, not wrong
+    version = notification_version(user_id)
+    with _supervisor_cache_lock:
+        entry = _supervisor_cache.get(key)
+        if entry is not None:
+            created_at, built_version, supervisor = entry
+            if now - created_at < SUPERVISOR_CACHE_TTL_SECONDS and built_version == version:
+                _supervisor_cache.move_to_end(key)
+                return supervisor
+            del _supervisor_cache[key]
+
+    # Build outside the lock so one slow build doesn't block other users
+    supervisor = create_agent_supervisor(user_id=user_id)
+
+    with _supervisor_cache_lock:
+        _supervisor_cache[key] = (now, version, supervisor)
+        _supervisor_cache.move_to_end(key)
+        while len(_supervisor_cache) > SUPERVISOR_CACHE_MAX_SIZE:
+            _supervisor_cache.popitem(last=False)
+    return supervisor
+
+def invalidate_supervisor_cache(user_id=None):
+    """Drop the cached supervisor for one user, or for everyone when user_id is None."""
+    with _supervisor_cache_lock:
+        if user_id is None:
+            _supervisor_cache.clear()
+        else:
+            _supervisor_cache.pop(str(user_id), None)
 
 
 
@@ -0,0 +1,109 @@
+"""
+Micro-benchmark for the shared LLM client registry.
+
+Starts a local stub of the chat completions endpoint (keep-alive HTTP/1.1, canned
+reply) and compares the per-call cost of
+  - a new openai.OpenAI client per call (own httpx client, new connection each time),
+  - a new ChatOpenAI per call, as generate_summary used to,
+  - the shared pooled model from agents.llm_clients.
+The stub answers instantly, so the numbers are client-side overhead only. Against the
+real API every new connection also pays a TLS handshake, so real savings are larger.
+
+Run from the repository root:
+    python -m agents.bench_llm_clients [calls]
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETION = {
+    "id": "chatcmpl-stub",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6},
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this Nagle + delayed ACK add ~40 ms
+    disable_nagle_algorithm = True
+    connections = set()
+
+    def do_POST(self):
+        StubHandler.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps(COMPLETION).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def per_call_ms(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main(calls=200):
+    server = start_stub_server()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    # Client overhead only: the scheduler's per-minute quota would throttle the loop
+    os.environ.setdefault("OPENAI_RPM", "*=0")
+
+    from langchain_openai import ChatOpenAI
+    from openai import OpenAI
+    from agents.llm_clients import get_chat_model
+
+    def new_openai_client_per_call():
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.environ["OPENAI_BASE_URL"])
+        try:
+            return client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": "hello"}])
+        finally:
+            client.close()
+
+    def new_client_per_call():
+        llm = ChatOpenAI(model="gpt-4o", temperature=0.2, api_key=os.getenv("OPENAI_API_KEY"),
+                         base_url=os.environ["OPENAI_BASE_URL"])
+        return llm.invoke("Summarize: hello")
+
+    def shared_client():
+        return get_chat_model("gpt-4o", temperature=0.2).invoke("Summarize: hello")
+
+    variants = [
+        ("New openai.OpenAI per call", new_openai_client_per_call),
+        ("New ChatOpenAI per call", new_client_per_call),
+        ("Shared pooled model", shared_client),
+    ]
+    print(f"Calls: {calls}")
+    for label, fn in variants:
+        with contextlib.redirect_stdout(io.StringIO()):  # usage logging would skew the timing
+            fn()  # warm up imports and the pool
+            StubHandler.connections.clear()
+            ms = per_call_ms(fn, calls)
+        print(f"{label:<28} {ms:6.2f} ms/call, {len(StubHandler.connections)} TCP connections")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,141 @@
+"""
+Benchmark for the unread-notification query and read receipts on a large reads table.
+
+Builds a throwaway users.db-style SQLite database with the app's models, fills
+notification_reads with ~1M rows (including duplicate receipts, as the old mark-read
+endpoint produced) and times
+  - the old unread path: two count()s plus the NOT IN anti-join, with no index on
+    notification_reads (the schema before migration 2),
+  - the one-time dedupe and unique index build (migration 2),
+  - the same anti-join with the unique index, and the cached get_unread_notifications,
+  - marking 50 notifications read one request at a time vs 50 in one bulk upsert, and
+    "mark all read" on top of that (a single upsert that skips existing receipts),
+    checking that the bulk read also changes the version the supervisor cache sees.
+
+Run from the repository root:
+    python -m agents.bench_notification_reads [reads]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from flask import Flask
+
+from models import db, NotificationRead, TeamNotification, User
+
+USERS = 2500
+NOTIFICATIONS = 500
+DUPLICATE_SHARE = 0.1
+
+
+def report(label, ms, note=""):
+    print(f"{label:<52} {ms:9.3f} ms  {note}".rstrip())
+
+
+def timed_ms(fn, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def old_unread_query(user_id):
+    query = db.session.query(TeamNotification).filter(TeamNotification.is_active == True)
+    query.count()
+    read_notifications = db.session.query(NotificationRead.notification_id).filter(
+        NotificationRead.user_id == user_id
+    )
+    read_notifications.count()
+    return query.filter(~TeamNotification.id.in_(read_notifications)).order_by(
+        db.case(
+            {'Internal Announcement': 1, 'External Broadcast For Clients': 2, 'General Notes': 3},
+            value=TeamNotification.priority
+        ),
+        TeamNotification.timestamp.desc()
+    ).all()
+
+
+def populate(reads):
+    conn = db.session.connection()
+    conn.execute(db.text("DROP INDEX IF EXISTS uq_notification_reads_user_id_notification_id"))
+    conn.execute(db.insert(User), [
+        {'id': i, 'username': f'user{i}', 'password_hash': 'x', 'role': 'sales'} for i in range(1, USERS + 1)
+    ])
+    conn.execute(db.insert(TeamNotification), [
+        {'id': i, 'manager_id': 1, 'message': f'Notification {i}', 'is_active': True, 'priority': 'General Notes'}
+        for i in range(1, NOTIFICATIONS + 1)
+    ])
+    rng = random.Random(0)
+    unique = int(reads * (1 - DUPLICATE_SHARE))
+    per_user = max(1, unique // USERS)
+    rows = [
+        {'notification_id': n, 'user_id': u}
+        for u in range(1, USERS + 1)
+        for n in rng.sample(range(1, NOTIFICATIONS + 1), min(per_user, NOTIFICATIONS - 100))
+    ]
+    rows += rng.sample(rows, reads - len(rows))  # double clicks and several tabs
+    conn.execute(db.insert(NotificationRead), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def main(reads=1_000_000):
+    from agents.notification_helper import (
+        get_unread_notifications, mark_notifications_read, notification_version, unread_notification_cache
+    )
+    from migrations import dedupe_notification_reads
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            total = populate(reads)
+            user_id = 1
+            print(f"notification_reads: {total} rows, {USERS} users, {NOTIFICATIONS} notifications")
+
+            ms, unread = timed_ms(lambda: old_unread_query(user_id))
+            report("Before: unread query (2 counts + NOT IN, no index)", ms, f"({len(unread)} unread)")
+
+            start = time.perf_counter()
+            removed = dedupe_notification_reads(db.session.connection())
+            db.session.execute(db.text(
+                "CREATE UNIQUE INDEX uq_notification_reads_user_id_notification_id "
+                "ON notification_reads (user_id, notification_id)"))
+            db.session.commit()
+            report("One-time dedupe + unique index", (time.perf_counter() - start) * 1000,
+                   f"({removed} duplicates removed)")
+
+            ms, _ = timed_ms(lambda: old_unread_query(user_id))
+            report("After: unread query (same SQL, unique index)", ms)
+            unread_notification_cache.clear()
+            get_unread_notifications(user_id)
+            ms, _ = timed_ms(lambda: get_unread_notifications(user_id), repeat=1000)
+            report("After: get_unread_notifications (cached)", ms)
+
+            ids = [n.id for n in unread][:100]
+            one_by_one, bulk = ids[:50], ids[50:]
+
+            def mark_one_by_one():
+                for notification_id in one_by_one:
+                    db.session.add(NotificationRead(notification_id=notification_id, user_id=user_id))
+                    db.session.commit()
+
+            ms, _ = timed_ms(mark_one_by_one, repeat=1)
+            report(f"Mark {len(one_by_one)} read, one insert + commit each", ms)
+            # The supervisor cache asks with str(user_id); the read must reach that key too
+            seen_by_supervisor = notification_version(str(user_id))
+            ms, marked = timed_ms(lambda: mark_notifications_read(user_id, bulk), repeat=1)
+            report(f"Mark {len(marked)} read, one bulk upsert", ms)
+            assert notification_version(str(user_id)) != seen_by_supervisor, "read not visible to the supervisor"
+            assert not set(marked) & {n['id'] for n in get_unread_notifications(str(user_id))}
+            ms, marked = timed_ms(lambda: mark_notifications_read(user_id), repeat=1)
+            report("Mark all read, one bulk upsert", ms, f"({len(marked)} new, existing receipts skipped)")
+            db.session.remove()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
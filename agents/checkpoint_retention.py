@@ -0,0 +1,129 @@
+import os
+import threading
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from agents.checkpointer import get_checkpointer
+
+# Retention for the LangGraph checkpoint store: only the newest checkpoints of each
+# thread are needed to resume a chat (the latest one carries the full message state),
+# so older ones are pruned and the freed pages are handed back with (incremental) VACUUM.
+
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "10"))
+CHECKPOINT_MAINTENANCE_INTERVAL_HOURS = float(os.getenv("CHECKPOINT_MAINTENANCE_INTERVAL_HOURS", "24"))
+
+
+def delete_checkpoint_threads(thread_ids):
+    """Remove every checkpoint and pending write for the given thread ids (chat ids)."""
+    saver = get_checkpointer()
+    for thread_id in thread_ids:
+        saver.delete_thread(str(thread_id))
+
+
+def prune_checkpoints(keep_last=CHECKPOINT_KEEP_LAST):
+    """
+    Keep only the newest `keep_last` checkpoints per thread and namespace.
+
+    Writes belonging to pruned checkpoints are removed too. Returns
+    (checkpoints deleted, writes deleted). Only the SQLite backend is pruned.
+    """
+    saver = get_checkpointer()
+    if not isinstance(saver, SqliteSaver):
+        print(f"Checkpoint pruning is not supported for {type(saver).__name__}; skipping")
+        return 0, 0
+    keep_last = max(1, int(keep_last))
+
+    with saver.cursor() as cur:
+        # checkpoint ids are time-ordered (uuid6), so the newest sort last
+        cur.execute(
+            """
+            DELETE FROM checkpoints
+            WHERE (thread_id, checkpoint_ns, checkpoint_id) IN (
+                SELECT thread_id, checkpoint_ns, checkpoint_id FROM (
+                    SELECT thread_id, checkpoint_ns, checkpoint_id,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY thread_id, checkpoint_ns
+                               ORDER BY checkpoint_id DESC
+                           ) AS rn
+                    FROM checkpoints
+                ) WHERE rn > ?
+            )
+            """,
+            (keep_last,),
+        )
+        checkpoints_deleted = cur.rowcount
+        cur.execute(
+            """
+            DELETE FROM writes
+            WHERE NOT EXISTS (
+                SELECT 1 FROM checkpoints c
+                WHERE c.thread_id = writes.thread_id
+                  AND c.checkpoint_ns = writes.checkpoint_ns
+                  AND c.checkpoint_id = writes.checkpoint_id
+            )
+            """
+        )
+        writes_deleted = cur.rowcount
+    return checkpoints_deleted, writes_deleted
+
+
+def _database_bytes(conn):
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    return page_size * page_count
+
+
+def compact_checkpoints(full=False):
+    """
+    Return free pages of the checkpoint database to the filesystem.
+
+    The first run (or full=True) switches the file to auto_vacuum=INCREMENTAL with a
+    full VACUUM; later runs only need the cheap incremental vacuum. Returns bytes reclaimed.
+    """
+    saver = get_checkpointer()
+    if not isinstance(saver, SqliteSaver):
+        print(f"Checkpoint compaction is not supported for {type(saver).__name__}; skipping")
+        return 0
+
+    with saver.lock:
+        saver.setup()
+        conn = saver.conn
+        conn.commit()  # VACUUM can't run inside a transaction
+        before = _database_bytes(conn)
+        incremental = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        if full or not incremental:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+        else:
+            conn.execute("PRAGMA incremental_vacuum")
+        conn.commit()
+        # Fold the WAL back into the main file so the size change shows on disk
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        after = _database_bytes(conn)
+    return max(0, before - after)
+
+
+def run_checkpoint_maintenance(keep_last=CHECKPOINT_KEEP_LAST, full=False):
+    """Prune then compact. Returns (checkpoints deleted, writes deleted, bytes reclaimed)."""
+    checkpoints_deleted, writes_deleted = prune_checkpoints(keep_last)
+    reclaimed = compact_checkpoints(full=full)
+    return checkpoints_deleted, writes_deleted, reclaimed
+
+
+def start_checkpoint_maintenance(interval_hours=CHECKPOINT_MAINTENANCE_INTERVAL_HOURS):
+    """Run checkpoint maintenance on a daemon thread every `interval_hours` (<= 0 disables)."""
+    if interval_hours <= 0:
+        return None
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval_hours * 3600):
+            try:
+                checkpoints_deleted, writes_deleted, reclaimed = run_checkpoint_maintenance()
+                print(f"[checkpoints] pruned {checkpoints_deleted} checkpoints, {writes_deleted} writes; "
+                      f"reclaimed {reclaimed} bytes")
+            except Exception as e:
+                print(f"[checkpoints] maintenance failed: {e!r}")
+
+    threading.Thread(target=loop, name="checkpoint-maintenance", daemon=True).start()
+    return stop
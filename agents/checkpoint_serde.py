@@ -0,0 +1,155 @@
+import hashlib
+import os
+import threading
+import time
+
+import zstandard
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# Optional compressed serializer for LangGraph checkpoints. Values are msgpack-encoded by
+# the stock JsonPlusSerializer and then zstd-compressed; the stored type tag gets a
+# "+zstd" (or "+zstd-dict-<dictionary id>") suffix so uncompressed rows keep loading
+# unchanged. The id is a hash of the dictionary, so a row is never decoded with a
+# different (e.g. retrained) dictionary than it was written with.
+#
+# CHECKPOINT_COMPRESSION=zstd     enable compression (off by default)
+# CHECKPOINT_ZSTD_LEVEL=3         compression level
+# CHECKPOINT_ZSTD_DICT_PATH=...   trained dictionary (see train_checkpoint_dictionary)
+
+CHECKPOINT_COMPRESSION = os.getenv("CHECKPOINT_COMPRESSION", "none")
+CHECKPOINT_ZSTD_LEVEL = int(os.getenv("CHECKPOINT_ZSTD_LEVEL", "3"))
+CHECKPOINT_ZSTD_DICT_PATH = os.getenv("CHECKPOINT_ZSTD_DICT_PATH")
+
+ZSTD_SUFFIX = "+zstd"
+ZSTD_DICT_SUFFIX = "+zstd-dict"
+# Payloads smaller than this aren't worth a zstd frame header
+MIN_COMPRESS_BYTES = 256
+
+
+def dictionary_id(dict_data):
+    """Short, stable id of a zstd dictionary's bytes, as used in the type tag."""
+    return hashlib.sha256(dict_data).hexdigest()[:16]
+
+
+class ZstdCheckpointSerializer:
+    """SerializerProtocol wrapper that zstd-compresses another serializer's output."""
+
+    def __init__(self, serde=None, level=CHECKPOINT_ZSTD_LEVEL, dict_data=None):
+        self.serde = serde or JsonPlusSerializer()
+        self.level = level
+        self.dict_data = zstandard.ZstdCompressionDict(dict_data) if dict_data else None
+        self.dict_id = dictionary_id(dict_data) if dict_data else None
+        # zstd (de)compressors are not thread-safe; keep one pair per thread
+        self._local = threading.local()
+
+    def _codecs(self):
+        codecs = getattr(self._local, "codecs", None)
+        if codecs is None:
+            codecs = {
+                "compress": zstandard.ZstdCompressor(level=self.level, dict_data=self.dict_data),
+                "decompress": zstandard.ZstdDecompressor(),
+                "decompress_dict": zstandard.ZstdDecompressor(dict_data=self.dict_data) if self.dict_data else None,
+            }
+            self._local.codecs = codecs
+        return codecs
+
+    def dumps(self, obj):
+        return self.serde.dumps(obj)
+
+    def loads(self, data):
+        return self.serde.loads(data)
+
+    def dumps_typed(self, obj):
+        type_, data = self.serde.dumps_typed(obj)
+        if len(data) < MIN_COMPRESS_BYTES:
+            return type_, data
+        suffix = f"{ZSTD_DICT_SUFFIX}-{self.dict_id}" if self.dict_data else ZSTD_SUFFIX
+        return type_ + suffix, self._codecs()["compress"].compress(data)
+
+    def loads_typed(self, data):
+        type_, payload = data
+        base_type, dict_suffix, dict_id = type_.rpartition(ZSTD_DICT_SUFFIX)
+        if dict_suffix:
+            decompressor = self._codecs()["decompress_dict"]
+            if decompressor is None:
+                raise ValueError("Checkpoint was compressed with a zstd dictionary; set CHECKPOINT_ZSTD_DICT_PATH")
+            # Rows tagged before dictionary ids existed ("+zstd-dict" alone) can't be checked
+            dict_id = dict_id.lstrip("-")
+            if dict_id and dict_id != self.dict_id:
+                raise ValueError(
+                    f"Checkpoint was compressed with zstd dictionary {dict_id}, but "
+                    f"CHECKPOINT_ZSTD_DICT_PATH holds dictionary {self.dict_id}"
+                )
+            return self.serde.loads_typed((base_type, decompressor.decompress(payload)))
+        if type_.endswith(ZSTD_SUFFIX):
+            payload = self._codecs()["decompress"].decompress(payload)
+            return self.serde.loads_typed((type_[:-len(ZSTD_SUFFIX)], payload))
+        return self.serde.loads_typed((type_, payload))
+
+
+def get_checkpoint_serde():
+    """Serializer for the configured compression, or None for LangGraph's default."""
+    if CHECKPOINT_COMPRESSION != "zstd":
+        return None
+    dict_data = None
+    if CHECKPOINT_ZSTD_DICT_PATH:
+        with open(CHECKPOINT_ZSTD_DICT_PATH, "rb") as f:
+            dict_data = f.read()
+    return ZstdCheckpointSerializer(dict_data=dict_data)
+
+
+def _sqlite_blob_rows(saver):
+    """(table, rowid, type, blob) for every checkpoint and write stored by a SqliteSaver."""
+    with saver.cursor(transaction=False) as cur:
+        rows = [("checkpoints", rowid, type_, blob)
+                for rowid, type_, blob in cur.execute("SELECT rowid, type, checkpoint FROM checkpoints")]
+        rows += [("writes", rowid, type_, blob)
+                 for rowid, type_, blob in cur.execute("SELECT rowid, type, value FROM writes")]
+    return rows
+
+
+def train_checkpoint_dictionary(saver, path, dict_size=112640):
+    """Train a zstd dictionary on the stored checkpoints (uncompressed form) and save it to `path`."""
+    plain = JsonPlusSerializer()
+    samples = []
+    for table, rowid, type_, blob in _sqlite_blob_rows(saver):
+        if type_ and blob:
+            samples.append(plain.dumps_typed(saver.serde.loads_typed((type_, blob)))[1])
+    dictionary = zstandard.train_dictionary(dict_size, samples)
+    with open(path, "wb") as f:
+        f.write(dictionary.as_bytes())
+    return len(samples)
+
+
+def recompress_checkpoints(saver, serde):
+    """
+    Rewrite every stored checkpoint and write with `serde` (SQLite backend).
+
+    Returns a dict with row count, stored bytes before/after and the time to load every
+    row before/after, so the effect of compression can be measured on real data.
+    """
+    rows = _sqlite_blob_rows(saver)
+    stats = {"rows": 0, "bytes_before": 0, "bytes_after": 0, "load_seconds_before": 0.0, "load_seconds_after": 0.0}
+    updates = []
+    for table, rowid, type_, blob in rows:
+        if not type_ or blob is None:
+            continue
+        start = time.perf_counter()
+        value = saver.serde.loads_typed((type_, blob))
+        stats["load_seconds_before"] += time.perf_counter() - start
+
+        new_type, new_blob = serde.dumps_typed(value)
+        start = time.perf_counter()
+        serde.loads_typed((new_type, new_blob))
+        stats["load_seconds_after"] += time.perf_counter() - start
+
+        stats["rows"] += 1
+        stats["bytes_before"] += len(blob)
+        stats["bytes_after"] += len(new_blob)
+        updates.append((table, rowid, new_type, new_blob))
+
+    with saver.cursor() as cur:
+        for table, rowid, new_type, new_blob in updates:
+            column = "checkpoint" if table == "checkpoints" else "value"
+            cur.execute(f"UPDATE {table} SET type = ?, {column} = ? WHERE rowid = ?", (new_type, new_blob, rowid))
+    return stats
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import threading
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from agents.checkpoint_serde import get_checkpoint_serde
+from sqlite_profile import connect_sqlite
+
+# Single place that owns the LangGraph checkpointer shared by the client supervisor,
+# the general supervisor and the manager agent.
+#
+# CHECKPOINT_BACKEND picks the backend:
+#   sqlite   (default) - CHECKPOINT_SQLITE_PATH, one connection per thread
+#   postgres           - CHECKPOINT_POSTGRES_URL, psycopg connection pool for multi-node setups
+# Other backends can be added with register_checkpoint_backend(). Both built-in backends
+# use the serializer from agents.checkpoint_serde (zstd compression when enabled).
+
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")
+CHECKPOINT_SQLITE_PATH = os.getenv("CHECKPOINT_SQLITE_PATH", "database/suhail_database.db")
+CHECKPOINT_POSTGRES_URL = os.getenv("CHECKPOINT_POSTGRES_URL")
+CHECKPOINT_POSTGRES_POOL_SIZE = int(os.getenv("CHECKPOINT_POSTGRES_POOL_SIZE", "10"))
+
+
+class ThreadLocalSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver that gives every thread its own connection.
+
+    The stock saver shares one connection between all Flask threads behind a single
+    lock, which serializes every checkpoint read and write. Here each thread opens its
+    own connection (with the sqlite_profile pragmas, so WAL lets readers run alongside
+    the writer) and only waits on SQLite's busy timeout.
+    """
+
+    def __init__(self, path, *, serde=None):
+        self.path = path
+        self._local = threading.local()
+        super().__init__(self._thread_connection(), serde=serde)
+
+    def _thread_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect_sqlite(self.path, check_same_thread=False)
+            self._local.conn = conn
+            self._local.lock = threading.Lock()
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self._thread_connection()
+
+    @conn.setter
+    def conn(self, value):
+        # SqliteSaver.__init__ assigns the connection it was given; that is this thread's already
+        pass
+
+    @property
+    def lock(self):
+        self._thread_connection()
+        return self._local.lock
+
+    @lock.setter
+    def lock(self, value):
+        pass
+
+
+def _create_sqlite_checkpointer():
+    os.makedirs(os.path.dirname(CHECKPOINT_SQLITE_PATH) or ".", exist_ok=True)
+    return ThreadLocalSqliteSaver(CHECKPOINT_SQLITE_PATH, serde=get_checkpoint_serde())
+
+
+def _create_postgres_checkpointer():
+    from langgraph.checkpoint.postgres import PostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+
+    if not CHECKPOINT_POSTGRES_URL:
+        raise ValueError("CHECKPOINT_POSTGRES_URL is required when CHECKPOINT_BACKEND=postgres")
+
+    pool = ConnectionPool(
+        CHECKPOINT_POSTGRES_URL,
+        max_size=CHECKPOINT_POSTGRES_POOL_SIZE,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+    )
+    saver = PostgresSaver(pool, serde=get_checkpoint_serde())
+    saver.setup()
+    return saver
+
+
+_BACKENDS = {
+    "sqlite": _create_sqlite_checkpointer,
+    "postgres": _create_postgres_checkpointer,
+}
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def register_checkpoint_backend(name, factory):
+    """Make a checkpointer factory selectable through CHECKPOINT_BACKEND."""
+    _BACKENDS[name] = factory
+
+
+def get_checkpointer():
+    """Return the process-wide checkpointer, creating it on first use."""
+    global _checkpointer
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                if CHECKPOINT_BACKEND not in _BACKENDS:
+                    raise ValueError(
+                        f"Unknown CHECKPOINT_BACKEND '{CHECKPOINT_BACKEND}'. Available: {list(_BACKENDS)}"
+                    )
+                _checkpointer = _BACKENDS[CHECKPOINT_BACKEND]()
+    return _checkpointer
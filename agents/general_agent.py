@@ -1,11 +1,13 @@
+import hashlib
 import os
-import sqlite3
 
-from langchain_openai import ChatOpenAI
 from langgraph_supervisor import create_supervisor
-from agents.package_detals.agent import agent_policy_package_details
+from agents.package_detals.agent import PACKAGE_DATA_VERSION, agent_policy_package_details
 from agents.spreadsheet.spreadsheet_agent import agent_spreadsheet_data
-from langgraph.checkpoint.sqlite import SqliteSaver
+from agents.checkpointer import get_checkpointer
+from agents.history_policy import SupervisorState, make_history_hook
+from agents.llm_clients import get_chat_model
+from agents.response_cache import ResponseCache
 
 from dotenv import load_dotenv
 
@@ -15,11 +17,11 @@ load_dotenv()
 openai_key = os.getenv("OPENAI_API_KEY")
 
 # setting up LLM
-llm = ChatOpenAI(model='gpt-4o',temperature=0.2,api_key=openai_key)
+# Shared, connection-pooled model (see agents/llm_clients.py)
+llm = get_chat_model('gpt-4o', temperature=0.2)
 
-# config checkpoint
-conn = sqlite3.connect("database/suhail_database.db",check_same_thread=False)
-memory = SqliteSaver(conn)
+# config checkpoint (shared with the client supervisor)
+memory = get_checkpointer()
 
 supervisor_prompt= '''
 {
@@ -58,8 +60,16 @@ supervisor_general = create_supervisor(
     prompt=(
         supervisor_prompt
     ),
-    output_mode="last_message"
+    output_mode="last_message",
+    # Only recent turns plus a rolling summary are sent to the model (agents/history_policy.py)
+    pre_model_hook=make_history_hook(llm, supervisor_prompt),
+    state_schema=SupervisorState
 )
 
 supervisor_agent_general = supervisor_general.compile(checkpointer=memory)
 
+# Cached answers to first questions in general chats; keyed on the package data and the
+# prompt so either changing invalidates them (see agents/response_cache.py)
+general_response_cache = ResponseCache(
+    version=f"{PACKAGE_DATA_VERSION}-{hashlib.sha1(supervisor_prompt.encode('utf-8')).hexdigest()[:12]}"
+)
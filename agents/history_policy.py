@@ -0,0 +1,170 @@
+import os
+
+import tiktoken
+from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.constants import TAG_NOSTREAM
+from langgraph.prebuilt.chat_agent_executor import AgentState
+from typing_extensions import NotRequired
+
+# History policy for the supervisors. Chat threads are checkpointed in full, so without
+# this every GPT-4o call would replay the whole conversation. Before each model call the
+# supervisor now sees:
+#   system prompt + rolling summary of older turns + the last HISTORY_KEEP_TURNS turns
+# trimmed further (oldest turn first) until it fits in HISTORY_MAX_PROMPT_TOKENS.
+# The stored thread history itself is never modified.
+#
+# HISTORY_KEEP_TURNS=6            turns kept verbatim (a turn starts at a user message; 0 disables)
+# HISTORY_MAX_PROMPT_TOKENS=16000 cap on system prompt + summary + kept turns
+
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+HISTORY_MAX_PROMPT_TOKENS = int(os.getenv("HISTORY_MAX_PROMPT_TOKENS", "16000"))
+
+# Rough per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class SupervisorState(AgentState):
+    """Supervisor graph state plus the rolling summary that is checkpointed with the thread."""
+    history_summary: NotRequired[str]
+    # id of the last message folded into history_summary
+    history_summary_until: NotRequired[str]
+
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model("gpt-4o")
+        except Exception as e:
+            # tiktoken downloads its BPE files on first use; estimate if that isn't possible
+            print(f"[history] tiktoken unavailable ({e!r}); estimating tokens from characters")
+            _encoding = False
+    return _encoding
+
+
+def count_text_tokens(text):
+    encoding = _get_encoding()
+    if not text:
+        return 0
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def count_message_tokens(messages):
+    """Approximate prompt tokens for a list of messages (content plus tool-call arguments)."""
+    total = 0
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        total += MESSAGE_OVERHEAD_TOKENS + count_text_tokens(content)
+        for call in getattr(message, "tool_calls", None) or []:
+            total += count_text_tokens(call.get("name", "")) + count_text_tokens(str(call.get("args", "")))
+    return total
+
+
+def split_turns(messages):
+    """Group messages into turns, each starting at a user message (tool calls stay with their turn)."""
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+def _flatten(turns):
+    return [message for turn in turns for message in turn]
+
+
+def _format_for_summary(messages):
+    lines = []
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        if not content:
+            continue
+        speaker = "User" if isinstance(message, HumanMessage) else (message.name or message.type)
+        lines.append(f"{speaker}: {content}")
+    return "\n".join(lines)
+
+
+def summarize_history(llm, previous_summary, messages):
+    """Fold `messages` into the running summary with one LLM call."""
+    prompt = f"""You maintain a running summary of a health insurance sales conversation.
+
+Update the summary with the new messages below. Keep every fact the assistant may need
+later: client/company name, region, number of lives, budget per life, target loss ratio,
+package(s) discussed, historical claims, inception date, figures already quoted and any
+decisions or open questions. Be concise (at most 250 words). Return only the summary.
+
+Current summary:
+{previous_summary or "(none)"}
+
+New messages:
+{_format_for_summary(messages)}
+
+Updated summary:"""
+    response = llm.invoke(prompt)
+    return response.content if hasattr(response, "content") else str(response)
+
+
+def make_history_hook(llm, system_prompt="", keep_turns=HISTORY_KEEP_TURNS, max_tokens=HISTORY_MAX_PROMPT_TOKENS):
+    """
+    Build a pre_model_hook for create_supervisor that applies the history policy.
+
+    Use together with state_schema=SupervisorState so the rolling summary persists
+    in the thread's checkpoints.
+    """
+    # The summary call must not show up in the chat's token stream
+    summarizer = llm.with_config(tags=[TAG_NOSTREAM])
+    system_tokens = count_text_tokens(system_prompt)
+
+    def history_hook(state, config):
+        messages = state["messages"]
+        summary = state.get("history_summary") or ""
+        summary_until = state.get("history_summary_until")
+
+        # Messages already folded into the summary are never sent again
+        start = 0
+        if summary_until:
+            for i, message in enumerate(messages):
+                if message.id == summary_until:
+                    start = i + 1
+                    break
+            else:
+                summary = ""
+
+        turns = split_turns(messages[start:])
+        kept = turns[-keep_turns:] if keep_turns > 0 else turns
+        folded = turns[:len(turns) - len(kept)]
+
+        def prompt_tokens():
+            return system_tokens + count_text_tokens(summary) + count_message_tokens(_flatten(kept))
+
+        while len(kept) > 1 and prompt_tokens() > max_tokens:
+            folded.append(kept.pop(0))
+
+        update = {}
+        if folded:
+            folded_messages = _flatten(folded)
+            summary = summarize_history(summarizer, summary, folded_messages)
+            update["history_summary"] = summary
+            update["history_summary_until"] = folded_messages[-1].id
+
+        llm_input = _flatten(kept)
+        if summary:
+            llm_input = [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] + llm_input
+        update["llm_input_messages"] = llm_input
+
+        thread_id = (config or {}).get("configurable", {}).get("thread_id")
+        full_tokens = system_tokens + count_message_tokens(messages)
+        sent_tokens = system_tokens + count_message_tokens(llm_input)
+        print(f"[history] thread={thread_id} messages {len(messages)}->{len(llm_input)} "
+              f"prompt tokens {full_tokens}->{sent_tokens}"
+              + (f" (summarized {len(folded)} turns)" if folded else ""))
+        return update
+
+    return history_hook
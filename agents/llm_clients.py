@@ -0,0 +1,129 @@
+import os
+import threading
+
+import httpx
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from openai import OpenAI
+
+from agents.llm_scheduler import SchedulingTransport
+from agents.llm_usage import PROMPT_CACHE_STATS
+
+# Shared OpenAI clients. Every ChatOpenAI / OpenAI instance used to bring its own httpx
+# client, so each new instance paid for a fresh TCP + TLS handshake. Everything now goes
+# through one pooled, keep-alive httpx client (plus an async twin for LangChain's async
+# paths), and models are created once per (model, temperature) and reused. The sync
+# client routes every request through the outbound scheduler (agents/llm_scheduler.py),
+# which also does the retrying, so the SDK's own retries are off by default.
+#
+# OPENAI_MAX_CONNECTIONS=50        total concurrent connections to the API
+# OPENAI_MAX_KEEPALIVE=20          idle connections kept open for reuse
+# OPENAI_KEEPALIVE_EXPIRY=60       seconds an idle connection is kept
+# OPENAI_TIMEOUT=120               read timeout (s); OPENAI_CONNECT_TIMEOUT=10
+# OPENAI_MAX_RETRIES=0             SDK-level retries on top of the scheduler's
+# OPENAI_BASE_URL                  optional, e.g. a proxy or the benchmark's stub server
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "0"))
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout():
+    return httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+
+
+_lock = threading.Lock()
+_http_client = None
+_http_async_client = None
+_openai_client = None
+_chat_models = {}
+_embeddings = {}
+
+
+def get_http_clients():
+    """The shared (sync, async) httpx clients."""
+    global _http_client, _http_async_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_async_client = httpx.AsyncClient(limits=_limits(), timeout=_timeout())
+                _http_client = httpx.Client(
+                    transport=SchedulingTransport(httpx.HTTPTransport(limits=_limits())),
+                    timeout=_timeout(),
+                )
+    return _http_client, _http_async_client
+
+
+def get_openai_client():
+    """Shared openai.OpenAI client (audio transcription and other direct API calls)."""
+    global _openai_client
+    if _openai_client is None:
+        http_client, _ = get_http_clients()
+        with _lock:
+            if _openai_client is None:
+                _openai_client = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    base_url=os.getenv("OPENAI_BASE_URL") or None,
+                    max_retries=OPENAI_MAX_RETRIES,
+                    http_client=http_client,
+                )
+    return _openai_client
+
+
+def get_chat_model(model="gpt-4o", temperature=0.2):
+    """
+    Shared ChatOpenAI for a (model, temperature) pair.
+
+    Usage is reported to PROMPT_CACHE_STATS, streamed calls included.
+    """
+    key = (model, temperature)
+    chat_model = _chat_models.get(key)
+    if chat_model is None:
+        http_client, http_async_client = get_http_clients()
+        with _lock:
+            chat_model = _chat_models.get(key)
+            if chat_model is None:
+                chat_model = ChatOpenAI(
+                    model=model,
+                    temperature=temperature,
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    base_url=os.getenv("OPENAI_BASE_URL") or None,
+                    timeout=_timeout(),
+                    max_retries=OPENAI_MAX_RETRIES,
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                    stream_usage=True,
+                    callbacks=[PROMPT_CACHE_STATS],
+                )
+                _chat_models[key] = chat_model
+    return chat_model
+
+
+def get_embeddings(model="text-embedding-3-small"):
+    """Shared OpenAIEmbeddings for a model."""
+    embeddings = _embeddings.get(model)
+    if embeddings is None:
+        http_client, http_async_client = get_http_clients()
+        with _lock:
+            embeddings = _embeddings.get(model)
+            if embeddings is None:
+                embeddings = OpenAIEmbeddings(
+                    model=model,
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    base_url=os.getenv("OPENAI_BASE_URL") or None,
+                    max_retries=OPENAI_MAX_RETRIES,
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                )
+                _embeddings[model] = embeddings
+    return embeddings
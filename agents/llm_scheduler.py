@@ -0,0 +1,266 @@
+import contextvars
+import heapq
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import httpx
+from tenacity import Retrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+# Central scheduler for outbound OpenAI calls. It sits in the shared httpx client from
+# agents/llm_clients.py as a transport, so every call (LangChain models inside the agent
+# graphs, summaries, transcription) goes through it:
+#   - per-model concurrency limits, granted by priority lane (chat > summary > transcription)
+#   - per-model token buckets for requests and (estimated) tokens per minute
+#   - retries with jittered exponential backoff (tenacity) on 429, 5xx and connection errors
+# Callers pick their lane with `with llm_priority(SUMMARY): ...`; the default is CHAT.
+# deduplicate() lets identical in-flight requests (e.g. summaries) share one call.
+#
+# OPENAI_CONCURRENCY="gpt-4o=16,whisper-1=4,*=8"   concurrent requests per model
+# OPENAI_RPM="*=500"                              requests per minute per model (0 = no limit)
+# OPENAI_TPM="gpt-4o=30000,*=0"                   tokens per minute per model (0 = no limit)
+# OPENAI_RETRY_ATTEMPTS=5, OPENAI_RETRY_MAX_WAIT=30
+
+CHAT, SUMMARY, TRANSCRIPTION = 0, 1, 2
+LANE_NAMES = {CHAT: "chat", SUMMARY: "summary", TRANSCRIPTION: "transcription"}
+
+OPENAI_RETRY_ATTEMPTS = int(os.getenv("OPENAI_RETRY_ATTEMPTS", "5"))
+OPENAI_RETRY_MAX_WAIT = float(os.getenv("OPENAI_RETRY_MAX_WAIT", "30"))
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _parse_per_model(value, default):
+    """'gpt-4o=16,*=8' -> {'gpt-4o': 16, '*': 8}."""
+    limits = {"*": default}
+    for item in (value or "").split(","):
+        if "=" in item:
+            model, limit = item.split("=", 1)
+            limits[model.strip()] = float(limit)
+    return limits
+
+
+CONCURRENCY_LIMITS = _parse_per_model(os.getenv("OPENAI_CONCURRENCY", "gpt-4o=16,whisper-1=4"), 8)
+RPM_LIMITS = _parse_per_model(os.getenv("OPENAI_RPM"), 500)
+TPM_LIMITS = _parse_per_model(os.getenv("OPENAI_TPM"), 0)
+
+_priority = contextvars.ContextVar("llm_priority", default=CHAT)
+
+
+@contextmanager
+def llm_priority(lane):
+    """Run the enclosed OpenAI calls in the given lane (CHAT, SUMMARY or TRANSCRIPTION)."""
+    token = _priority.set(lane)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class PrioritySemaphore:
+    """Counting semaphore that hands free slots to the waiter with the best (lowest) priority."""
+
+    def __init__(self, slots):
+        self.slots = slots
+        self._cond = threading.Condition()
+        self._waiters = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+
+    def acquire(self, priority):
+        with self._cond:
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            while self.slots <= 0 or self._waiters[0] != entry:
+                self._cond.wait()
+            heapq.heappop(self._waiters)
+            self.slots -= 1
+            self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self.slots += 1
+            self._cond.notify_all()
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute and holds at most one minute's worth."""
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = max(float(per_minute), 1.0)
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, amount=1.0):
+        """
+        Block until `amount` units are available, then charge all of them. An amount above
+        capacity waits for a full bucket and leaves it in debt, which later callers wait out.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+                self.updated = now
+                needed = min(amount, self.capacity)
+                if self.available >= needed:
+                    self.available -= amount
+                    return
+                wait = (needed - self.available) / self.rate
+            time.sleep(wait)
+
+
+class _ModelLimits:
+    def __init__(self, model):
+        def limit(limits):
+            return limits.get(model, limits["*"])
+
+        self.semaphore = PrioritySemaphore(int(limit(CONCURRENCY_LIMITS)))
+        self.requests = TokenBucket(limit(RPM_LIMITS)) if limit(RPM_LIMITS) > 0 else None
+        self.tokens = TokenBucket(limit(TPM_LIMITS)) if limit(TPM_LIMITS) > 0 else None
+
+
+_limits = {}
+_limits_lock = threading.Lock()
+
+
+def _model_limits(model):
+    with _limits_lock:
+        if model not in _limits:
+            _limits[model] = _ModelLimits(model)
+        return _limits[model]
+
+
+_MULTIPART_MODEL = re.compile(rb'name="model"\r\n\r\n([^\r\n]+)')
+
+
+def _request_model_and_tokens(request):
+    """Model name and a rough token estimate (body bytes / 4 + max_tokens) for a request."""
+    body = request.read()
+    model, max_tokens = "*", 0
+    content_type = request.headers.get("content-type", "")
+    if "json" in content_type:
+        try:
+            payload = json.loads(body)
+            model = payload.get("model", "*")
+            max_tokens = payload.get("max_tokens") or payload.get("max_completion_tokens") or 0
+        except ValueError:
+            pass
+    elif "multipart" in content_type:
+        match = _MULTIPART_MODEL.search(body)
+        if match:
+            model = match.group(1).decode("utf-8", "replace")
+        body = b""  # audio bytes say nothing about tokens
+    return model, len(body) // 4 + max_tokens
+
+
+class _RetryableResponse(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that frees the concurrency slot once it has been read or closed."""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            release, self._release = self._release, None
+            if release:
+                release()
+
+
+class SchedulingTransport(httpx.BaseTransport):
+    """httpx transport that applies the scheduler's limits, lanes and retries to every request."""
+
+    def __init__(self, transport):
+        self._transport = transport
+
+    def handle_request(self, request):
+        model, estimated_tokens = _request_model_and_tokens(request)
+        limits = _model_limits(model)
+        priority = _priority.get()
+
+        # The quota waits and the backoff sleeps between retries happen without a
+        # concurrency slot, so they never hold up other lanes' calls
+        if limits.tokens:
+            limits.tokens.take(estimated_tokens)
+        retrying = Retrying(
+            retry=retry_if_exception_type((_RetryableResponse, httpx.ConnectError, httpx.ReadTimeout,
+                                           httpx.RemoteProtocolError)),
+            wait=wait_random_exponential(multiplier=0.5, max=OPENAI_RETRY_MAX_WAIT),
+            stop=stop_after_attempt(OPENAI_RETRY_ATTEMPTS),
+            reraise=True,
+            before_sleep=lambda state: print(
+                f"[llm-scheduler] retrying {model} ({LANE_NAMES.get(priority)}) after "
+                f"{state.outcome.exception()!r}, attempt {state.attempt_number}"
+            ),
+        )
+        for attempt in retrying:
+            with attempt:
+                # On the last attempt the error response goes to the SDK, which raises as usual
+                last_attempt = attempt.retry_state.attempt_number >= OPENAI_RETRY_ATTEMPTS
+                return self._send_once(request, limits, priority, last_attempt)
+
+    def _send_once(self, request, limits, priority, last_attempt):
+        if limits.requests:
+            limits.requests.take()
+        limits.semaphore.acquire(priority)
+        try:
+            response = self._transport.handle_request(request)
+            if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                response.close()
+                raise _RetryableResponse(response)
+        except BaseException:
+            limits.semaphore.release()
+            raise
+        # Hold the slot while the (possibly streamed) body is being consumed
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, limits.semaphore.release),
+            extensions=response.extensions,
+        )
+
+    def close(self):
+        self._transport.close()
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def deduplicate(key, fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) unless a call with the same key is already in flight, in
+    which case wait for it and return its result (or raise its exception).
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = _inflight[key] = Future()
+    if not owner:
+        return future.result()
+    try:
+        result = fn(*args, **kwargs)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
@@ -0,0 +1,51 @@
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Per-call token usage logging, focused on OpenAI's automatic prompt caching: every
+# chat completion reports how many of its input tokens were served from the cache
+# (usage_metadata["input_token_details"]["cache_read"]). Attach PROMPT_CACHE_STATS as
+# a callback to a ChatOpenAI model created with stream_usage=True so streamed calls
+# report usage too.
+
+
+class PromptCacheStats(BaseCallbackHandler):
+    """Callback that logs input/cached tokens per LLM call and keeps running totals."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if not usage:
+                    continue
+                input_tokens = usage.get("input_tokens", 0)
+                cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+                model = message.response_metadata.get("model_name", "?")
+                with self._lock:
+                    self.calls += 1
+                    self.input_tokens += input_tokens
+                    self.cached_tokens += cached
+                    hit_rate = self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
+                print(f"[llm-usage] model={model} input={input_tokens} cached={cached} "
+                      f"output={usage.get('output_tokens', 0)} | cache hit rate {hit_rate:.1%} "
+                      f"over {self.calls} calls")
+
+    def snapshot(self):
+        """Running totals as a dict."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "cached_tokens": self.cached_tokens,
+                "cache_hit_rate": self.cached_tokens / self.input_tokens if self.input_tokens else 0.0,
+            }
+
+
+PROMPT_CACHE_STATS = PromptCacheStats()
@@ -1,6 +1,5 @@
 import os
 from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.sqlite import SqliteSaver
 from agents.package_detals.agent import agent_policy_package_details
 from agents.spreadsheet.spreadsheet_agent import agent_spreadsheet_data
 from langgraph_supervisor import create_supervisor
@@ -0,0 +1,69 @@
+import os
+import threading
+from collections import deque
+
+# In-process pub/sub for team notifications. Routes that change notifications publish
+# an event; the SSE stream and the long-poll endpoint wait on the broker instead of
+# re-running the unread query every 30 s from every open tab. Events:
+#   {"type": "created", "notification": {...}}   broadcast to everyone
+#   {"type": "deactivated", "id": ...}          broadcast to everyone
+#   {"type": "read", "ids": [...]}              only to the reader (their other tabs)
+# Each event gets a sequence number; the last NOTIFICATION_EVENT_BUFFER events are kept
+# so a client can resume from the last one it saw. A client that fell further behind
+# (or whose process restarted) reloads the full unread list. The broker lives in one
+# process: with several worker processes each only sees its own publishes.
+#
+# NOTIFICATION_EVENT_BUFFER=256
+# NOTIFICATION_HEARTBEAT_SECONDS=25     SSE keep-alive comment interval
+# NOTIFICATION_LONG_POLL_SECONDS=25     how long a long-poll request waits for an event
+
+NOTIFICATION_EVENT_BUFFER = int(os.getenv("NOTIFICATION_EVENT_BUFFER", "256"))
+NOTIFICATION_HEARTBEAT_SECONDS = float(os.getenv("NOTIFICATION_HEARTBEAT_SECONDS", "25"))
+NOTIFICATION_LONG_POLL_SECONDS = float(os.getenv("NOTIFICATION_LONG_POLL_SECONDS", "25"))
+
+
+class NotificationBroker:
+    """Sequence-numbered event buffer that waiting readers block on."""
+
+    def __init__(self, buffer_size=NOTIFICATION_EVENT_BUFFER):
+        self._events = deque(maxlen=buffer_size)  # (seq, user_id or None, event)
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    @property
+    def seq(self):
+        with self._cond:
+            return self._seq
+
+    def publish(self, event, user_id=None):
+        """Record an event for everyone, or only for `user_id`, and wake the waiting readers."""
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, user_id, event))
+            self._cond.notify_all()
+            return self._seq
+
+    def _events_since(self, since, user_id):
+        if self._events and self._events[0][0] > since + 1:
+            return None  # the buffer no longer reaches back that far
+        return [(seq, event) for seq, target, event in self._events
+                if seq > since and target in (None, user_id)]
+
+    def wait(self, since, user_id, timeout):
+        """
+        (seq, events) for `user_id` published after `since`, waiting up to `timeout`
+        seconds for one. `events` is None when `since` is out of the buffer's reach (or
+        ahead of it, e.g. after a restart) and the caller has to reload everything.
+        """
+        with self._cond:
+            if since > self._seq:
+                return self._seq, None
+            events = self._events_since(since, user_id)
+            if events == []:
+                # Events for other users also wake us; keep waiting for the rest of the timeout
+                self._cond.wait_for(lambda: self._events_since(since, user_id) != [], timeout)
+                events = self._events_since(since, user_id)
+            return self._seq, events
+
+
+notification_broker = NotificationBroker()
@@ -1,48 +1,226 @@
-from typing import List, Dict
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, List
 from datetime import datetime
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from models import db, TeamNotification, NotificationRead
 
+# Unread notifications are served from an in-process cache instead of the
+# active-notifications / NOT IN (reads) anti-join on every poll and every client-chat
+# turn. It holds the active notifications (shared) and each user's read ids, and is kept
+# current write-through by the routes that change them (create, deactivate, mark read)
+# through the record_* functions below, always after their commit.
+#
+# Every change bumps a version counter; notification_version(user_id) is the version of
+# that user's unread list, so callers (the supervisor cache, ETags) can tell whether it
+# changed without looking at it. Other processes' writes are only picked up when entries
+# are reloaded after NOTIFICATION_CACHE_TTL_SECONDS.
+#
+# NOTIFICATION_CACHE_TTL_SECONDS=60
+# NOTIFICATION_CACHE_MAX_USERS=4096    users whose read ids are kept, least recently used evicted
+
+NOTIFICATION_CACHE_TTL_SECONDS = float(os.getenv("NOTIFICATION_CACHE_TTL_SECONDS", "60"))
+NOTIFICATION_CACHE_MAX_USERS = int(os.getenv("NOTIFICATION_CACHE_MAX_USERS", "4096"))
+
+# Priority ordering: Internal -> External -> General
+PRIORITY_RANK = {'Internal Announcement': 1, 'External Broadcast For Clients': 2, 'General Notes': 3}
+
+
+def notification_payload(n) -> Dict:
+    """JSON form of a TeamNotification, as sent to the notification UI."""
+    return {
+        'id': n.id,
+        'message': n.message,
+        'priority': n.priority,
+        'timestamp': n.timestamp.isoformat() if isinstance(n.timestamp, datetime) else n.timestamp
+    }
+
+
+class UnreadNotificationCache:
+    """Active notifications plus per-user read ids, with a version per user's unread list."""
+
+    def __init__(self, ttl_seconds=NOTIFICATION_CACHE_TTL_SECONDS, max_users=NOTIFICATION_CACHE_MAX_USERS):
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self._lock = threading.RLock()
+        # Versions restart with the process; the instance id keeps ETags from colliding
+        self.instance = uuid.uuid4().hex[:8]
+        self._counter = 0
+        self._active = None  # (loaded_at, [payload, ...] in display order)
+        self._active_version = 0
+        self._reads = OrderedDict()  # user_id -> (loaded_at, set of notification ids)
+        self._read_versions = {}  # user_id -> version of the user's last read change
+        self._unread = {}  # user_id -> (version, [payload, ...])
+
+    @staticmethod
+    def _key(user_id):
+        # Callers pass current_user.id (int) or the supervisor cache's str(user_id); both
+        # must hit the same entry, or a read through one leaves the other stale
+        return None if user_id is None else int(user_id)
+
+    def _bump(self):
+        self._counter += 1
+        return self._counter
+
+    @staticmethod
+    def _sorted(payloads):
+        # Newest first within a priority: sort by timestamp, then (stable) by rank
+        payloads = sorted(payloads, key=lambda p: p['timestamp'], reverse=True)
+        return sorted(payloads, key=lambda p: PRIORITY_RANK.get(p['priority'], len(PRIORITY_RANK) + 1))
+
+    def _active_list(self):
+        now = time.monotonic()
+        if self._active is None or now - self._active[0] >= self.ttl_seconds:
+            rows = db.session.query(TeamNotification).filter(TeamNotification.is_active == True).all()
+            active = self._sorted([notification_payload(n) for n in rows])
+            if self._active is None or active != self._active[1]:
+                self._active_version = self._bump()
+            self._active = (now, active)
+        return self._active[1]
+
+    def _read_ids(self, user_id):
+        now = time.monotonic()
+        entry = self._reads.get(user_id)
+        if entry is None or now - entry[0] >= self.ttl_seconds:
+            read_ids = {row[0] for row in db.session.query(NotificationRead.notification_id).filter(
+                NotificationRead.user_id == user_id
+            )}
+            # A reload after eviction can't tell what changed meanwhile, so it counts as a change
+            if (entry is None and user_id in self._read_versions) or (entry is not None and read_ids != entry[1]):
+                self._read_versions[user_id] = self._bump()
+            entry = self._reads[user_id] = (now, read_ids)
+            while len(self._reads) > self.max_users:
+                evicted, _ = self._reads.popitem(last=False)
+                self._unread.pop(evicted, None)
+        self._reads.move_to_end(user_id)
+        return entry[1]
+
+    def version(self, user_id=None) -> int:
+        """Version of the user's unread list (of the active list when user_id is None)."""
+        user_id = self._key(user_id)
+        with self._lock:
+            self._active_list()
+            if user_id is None:
+                return self._active_version
+            self._read_ids(user_id)
+            return max(self._active_version, self._read_versions.get(user_id, 0))
+
+    def unread(self, user_id=None) -> List[Dict]:
+        """The user's unread notifications (all active ones when user_id is None)."""
+        user_id = self._key(user_id)
+        with self._lock:
+            active = self._active_list()
+            if user_id is None:
+                return list(active)
+            read_ids = self._read_ids(user_id)
+            version = max(self._active_version, self._read_versions.get(user_id, 0))
+            cached = self._unread.get(user_id)
+            if cached is None or cached[0] != version:
+                cached = self._unread[user_id] = (version, [n for n in active if n['id'] not in read_ids])
+            return list(cached[1])
+
+    def record_created(self, notification):
+        with self._lock:
+            if self._active is not None:
+                # A reload between the commit and this call may have picked the row up already
+                payload = notification_payload(notification)
+                active = [n for n in self._active[1] if n['id'] != payload['id']] + [payload]
+                self._active = (self._active[0], self._sorted(active))
+            self._active_version = self._bump()
+
+    def record_deactivated(self, notification_id):
+        with self._lock:
+            if self._active is not None:
+                active = [n for n in self._active[1] if n['id'] != notification_id]
+                self._active = (self._active[0], active)
+            self._active_version = self._bump()
+
+    def record_read(self, user_id, notification_ids: Iterable[int]):
+        user_id = self._key(user_id)
+        with self._lock:
+            entry = self._reads.get(user_id)
+            if entry is not None:
+                entry[1].update(notification_ids)
+            self._read_versions[user_id] = self._bump()
+
+    def clear(self):
+        with self._lock:
+            self._active = None
+            self._reads.clear()
+            self._unread.clear()
+            self._active_version = self._bump()
+            for user_id in self._read_versions:
+                self._read_versions[user_id] = self._active_version
+
+
+unread_notification_cache = UnreadNotificationCache()
+
+
+def record_notification_created(notification):
+    """Write-through after a TeamNotification was committed."""
+    unread_notification_cache.record_created(notification)
+
+
+def record_notification_deactivated(notification_id: int):
+    """Write-through after a TeamNotification was deactivated and committed."""
+    unread_notification_cache.record_deactivated(notification_id)
+
+
+def record_notifications_read(user_id: int, notification_ids: Iterable[int]):
+    """Write-through after read receipts for the user were committed."""
+    unread_notification_cache.record_read(user_id, notification_ids)
+
+
+def mark_notifications_read(user_id: int, notification_ids: Iterable[int] = None) -> List[int]:
+    """
+    Record read receipts for the given active notifications (all active ones when
+    notification_ids is None) in a single INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+    Existing receipts are left alone, so repeats (double clicks, several tabs) are no-ops.
+    Commits, updates the cache and returns the ids that were newly marked read.
+    """
+    selected = db.select(
+        TeamNotification.id, db.literal(user_id), db.literal(datetime.utcnow())
+    ).where(TeamNotification.is_active == True)
+    if notification_ids is not None:
+        notification_ids = list(notification_ids)
+        if not notification_ids:
+            return []
+        selected = selected.where(TeamNotification.id.in_(notification_ids))
+    statement = (
+        sqlite_insert(NotificationRead)
+        .from_select(['notification_id', 'user_id', 'read_at'], selected)
+        .on_conflict_do_nothing(index_elements=['user_id', 'notification_id'])
+        .returning(NotificationRead.notification_id)
+    )
+    marked = [row[0] for row in db.session.execute(statement)]
+    db.session.commit()
+    if marked:
+        record_notifications_read(user_id, marked)
+    return marked
+
+
+def notification_version(user_id: int = None) -> int:
+    """Changes whenever the user's unread notifications change."""
+    return unread_notification_cache.version(user_id)
+
+
+def notification_etag(user_id: int) -> str:
+    """ETag value for the user's unread list."""
+    return f"{unread_notification_cache.instance}-{notification_version(user_id)}"
+
+
 def get_unread_notifications(user_id: int = None) -> List[Dict]:
     """
     Get all unread team notifications for a specific user.
     If user_id is None, returns all unread notifications.
     """
     try:
-        print(f"Getting unread notifications for user {user_id}")
-        
-        # Start with active notifications
-        query = db.session.query(TeamNotification).filter(
-            TeamNotification.is_active == True
-        )
-        print(f"Found {query.count()} total active notifications")
-        
-        # If user_id provided, exclude notifications that user has read
-        if user_id is not None:
-            read_notifications = db.session.query(NotificationRead.notification_id).filter(
-                NotificationRead.user_id == user_id
-            )
-            print(f"User has read {read_notifications.count()} notifications")
-            query = query.filter(~TeamNotification.id.in_(read_notifications))
-        
-        # Order by priority and timestamp
-        notifications = query.order_by(
-            # Priority ordering: Internal -> External -> General
-            db.case(
-                {'Internal Announcement': 1, 'External Broadcast For Clients': 2, 'General Notes': 3},
-                value=TeamNotification.priority
-            ),
-            TeamNotification.timestamp.desc()
-        ).all()
-        
-        # Convert to dictionary format
-        return [{
-            'id': n.id,
-            'message': n.message,
-            'priority': n.priority,
-            'timestamp': n.timestamp.isoformat() if isinstance(n.timestamp, datetime) else n.timestamp
-        } for n in notifications]
-        
+        return unread_notification_cache.unread(user_id)
     except Exception as e:
+        db.session.rollback()
         print(f"Error getting notifications: {e}")
         return []
 
@@ -50,13 +228,10 @@ def format_notifications_for_prompt(user_id: int = None) -> str:
     """Format unread notifications for inclusion in agent prompt"""
     notifications = get_unread_notifications(user_id)
     if not notifications:
-        print("No unread notifications found")
         return "No unread team notifications at the moment. How can I assist you further today?"
-        
-    print(f"Formatting {len(notifications)} notifications")
+
     notification_text = "\n🔔 **Unread Team Messages:**\n\n"
     for n in notifications:
         priority_icon = "🔴" if n['priority'] == "Internal Announcement" else "🟡" if n['priority'] == "External Broadcast For Clients" else "🟢"
         notification_text += f"{priority_icon} {n['message']}\n"
-    print(f"Final formatted text: {notification_text}")
     return notification_text
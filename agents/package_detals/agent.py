@@ -1,3 +1,6 @@
+import hashlib
+import json
+
 from langgraph.prebuilt import create_react_agent
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
@@ -13,6 +16,21 @@ class Policy(BaseModel):
     )
 
 
+class PolicyBenefitsQuery(BaseModel):
+    package_type: Literal["basic", "bronze", "silver", "gold", "diamond"] = Field(
+        default="basic",
+        description="The name of the policy package. Must be one of: basic, bronze, silver, gold, diamond."
+    )
+    benefits: list[str] = Field(
+        default_factory=list,
+        description="Benefits to return, e.g. ['Dental Care', 'Maternity and Childcare']. Partial names like 'dental' work."
+    )
+    fields: list[str] = Field(
+        default_factory=list,
+        description="General info fields to return, e.g. ['Network', 'Dental Limit', 'Room']. Partial names work."
+    )
+
+
 insurance_data = {
   "insurance_packages": [
     {
@@ -1258,6 +1276,11 @@ insurance_data = {
   ]
 }
 
+# Changes whenever the package data does; caches of answers derived from it key on this
+PACKAGE_DATA_VERSION = hashlib.sha1(
+    json.dumps(insurance_data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+).hexdigest()[:12]
+
 
 
 # === 3) Matching helpers ===
@@ -1283,17 +1306,45 @@ def _is_match(pkg_label: str, target_choice: str) -> bool:
     return False
 
 
-# === 4) Tool ===
+# === 3b) Precomputed index (built once at import) ===
+PACKAGE_LEVELS = ["basic", "bronze", "silver", "gold", "diamond"]
+
+def _build_package_index(data):
+    """level -> matching packages in sheet order; identical duplicate rows are kept once."""
+    index = {}
+    for level in PACKAGE_LEVELS:
+        matches = []
+        for pkg in data.get("insurance_packages", []):
+            if _is_match(pkg.get("package_type", ""), level) and pkg not in matches:
+                matches.append(pkg)
+        index[level] = matches
+    return index
+
+def _build_benefit_index(package_index):
+    """(level, normalized benefit name) -> [(package, benefit row)], one pair per package variant."""
+    index = {}
+    for level, packages in package_index.items():
+        for pkg in packages:
+            for benefit in pkg.get("benefits", []):
+                index.setdefault((level, _normalize(benefit.get("Benefit", ""))), []).append((pkg, benefit))
+    return index
+
+PACKAGE_INDEX = _build_package_index(insurance_data)
+BENEFIT_INDEX = _build_benefit_index(PACKAGE_INDEX)
+# Display names of every benefit, in sheet order
+BENEFIT_NAMES = list(dict.fromkeys(
+    benefit.get("Benefit", "") for packages in PACKAGE_INDEX.values() for pkg in packages for benefit in pkg.get("benefits", [])
+))
+
+
+# === 4) Tools ===
 @tool("get_policy_package_details", args_schema=Policy)
 def get_policy_package_details(package_type: str):
     """Provide details about a specific policy package (returns general_info + benefits)."""
     if "insurance_packages" not in insurance_data:
         return {"error": "insurance_data missing 'insurance_packages'."}
 
-    matches = [
-        pkg for pkg in insurance_data["insurance_packages"]
-        if _is_match(pkg.get("package_type", ""), package_type)
-    ]
+    matches = PACKAGE_INDEX.get(_normalize(package_type), [])
 
     if not matches:
         return {
@@ -1304,11 +1355,61 @@ def get_policy_package_details(package_type: str):
     return matches
 
 
+def _select_names(requested, available):
+    """Map requested (possibly partial) names onto available ones. Returns (selected, unknown)."""
+    selected, unknown = [], []
+    for name in requested:
+        wanted = _normalize(name)
+        found = [a for a in available if _normalize(a) == wanted] or \
+                [a for a in available if wanted and wanted in _normalize(a)]
+        if found:
+            selected.extend(a for a in found if a not in selected)
+        else:
+            unknown.append(name)
+    return selected, unknown
+
+
+@tool("get_policy_benefits", args_schema=PolicyBenefitsQuery)
+def get_policy_benefits(package_type: str, benefits: list[str] = None, fields: list[str] = None):
+    """Return only the requested benefits and general info fields of a policy package (much smaller than the full package)."""
+    level = _normalize(package_type)
+    packages = PACKAGE_INDEX.get(level, [])
+    if not packages:
+        return {"message": f"No packages matched '{package_type}'.", "available": PACKAGE_LEVELS}
+
+    benefit_names, unknown_benefits = _select_names(benefits or [], BENEFIT_NAMES)
+    field_names, unknown_fields = _select_names(fields or [], list(packages[0].get("general_info", {})))
+
+    result = []
+    for pkg in packages:
+        info = pkg.get("general_info", {})
+        result.append({
+            "package_type": pkg.get("package_type", ""),
+            "network": info.get("Network"),
+            "general_info": {f: info[f] for f in field_names if f in info},
+            "benefits": [
+                {k: v for k, v in row.items() if k != "Benefit Description"}
+                for name in benefit_names
+                for variant, row in BENEFIT_INDEX.get((level, _normalize(name)), [])
+                if variant is pkg
+            ],
+        })
+    response = {"packages": result}
+    if unknown_benefits or unknown_fields:
+        response["unknown"] = unknown_benefits + unknown_fields
+        response["available_benefits"] = BENEFIT_NAMES
+    return response
+
+
 # === 5) Agent factory ===
 def agent_policy_package_details(llm):
     return create_react_agent(
         model=llm,
-        prompt="You provide complete info about a specific insurance policy package, including general info and all benefits.",
+        prompt=(
+            "You provide complete info about a specific insurance policy package, including general info and all benefits. "
+            "When the question is about specific benefits or fields (e.g. dental limit, network, maternity), use "
+            "get_policy_benefits with just those; use get_policy_package_details only when the whole package is needed."
+        ),
         name="policy_detail_assistant",
-        tools=[get_policy_package_details],
+        tools=[get_policy_benefits, get_policy_package_details],
     )
\ No newline at end of file
@@ -0,0 +1,177 @@
+import os
+import re
+
+from agents.package_detals.agent import (
+    BENEFIT_INDEX,
+    BENEFIT_NAMES,
+    PACKAGE_INDEX,
+    PACKAGE_LEVELS,
+    _normalize,
+)
+
+# Structured, LLM-free access to the package data: the /v1/packages endpoints and a
+# router that answers simple chat lookups ("What's the dental limit on Silver?")
+# straight from the precomputed index instead of supervisor -> policy_detail_assistant.
+#
+# PACKAGE_FAST_PATH=true   let the chat router short-circuit simple package lookups
+
+PACKAGE_FAST_PATH = os.getenv("PACKAGE_FAST_PATH", "true").lower() == "true"
+
+# Words people use for a benefit -> its name in the sheet. Only words that mean the
+# benefit on their own: a body part or generic word ("eye", "organ", "equipment")
+# would answer "Does gold cover eye surgery?" with the wrong table, so those questions
+# need the benefit's full name or go to the supervisor.
+BENEFIT_ALIASES = {
+    "hospital": "Hospital Admission",
+    "hospitalization": "Hospital Admission",
+    "inpatient": "Hospital Admission",
+    "admission": "Hospital Admission",
+    "emergency": "Emergency Treatment",
+    "outpatient": "Outpatient Services",
+    "consultation": "Outpatient Services",
+    "consultations": "Outpatient Services",
+    "medication": "Medication",
+    "medications": "Medication",
+    "medicine": "Medication",
+    "medicines": "Medication",
+    "drugs": "Medication",
+    "pharmacy": "Medication",
+    "mental": "Mental Health",
+    "psychiatric": "Mental Health",
+    "maternity": "Maternity and Childcare",
+    "pregnancy": "Maternity and Childcare",
+    "childbirth": "Maternity and Childcare",
+    "childcare": "Maternity and Childcare",
+    "newborn": "Newborn Screening",
+    "vaccination": "Vaccinations",
+    "vaccinations": "Vaccinations",
+    "vaccine": "Vaccinations",
+    "vaccines": "Vaccinations",
+    "dental": "Dental Care",
+    "dentist": "Dental Care",
+    "teeth": "Dental Care",
+    "optical": "Optical Care",
+    "glasses": "Optical Care",
+    "vision": "Optical Care",
+    "bariatric": "Bariatric Surgery",
+    "contraception": "Contraception",
+    "dialysis": "Dialysis",
+    "donor": "Organ Harvest (Donor)",
+    "home healthcare": "Home Healthcare",
+    "home care": "Home Healthcare",
+    "telemedicine": "Telemedicine",
+    "disability": "Disability Treatment",
+    "congenital": "Congenital/Hereditary Conditions",
+    "hereditary": "Congenital/Hereditary Conditions",
+    "circumcision": "Circumcision (Male)",
+    "repatriation": "Corpse Repatriation",
+}
+BENEFIT_ALIASES.update({_normalize(name): name for name in BENEFIT_NAMES})
+
+# (?<!\w)/(?!\w) rather than \b: some names end in ")"
+_BENEFIT_PATTERN = re.compile(
+    r"(?<!\w)(" + "|".join(re.escape(a) for a in sorted(BENEFIT_ALIASES, key=len, reverse=True)) + r")(?!\w)"
+)
+_PACKAGE_PATTERN = re.compile(r"\b(" + "|".join(PACKAGE_LEVELS) + r")\b")
+# Anything that needs numbers, the offer simulation or judgement goes to the supervisor
+_ANALYSIS_PATTERN = re.compile(
+    r"\b(budget|premium|premiums|loss ratio|lr|lives|claims?|benchmarks?|regions?|central|eastern|western|"
+    r"northern|southern|recommend\w*|pitch|simulat\w*|offer|price|pricing|cost|probability|renewal|"
+    r"company|client|better|best|should|why)\b"
+)
+# Longest question the router will still treat as a simple lookup
+MAX_LOOKUP_WORDS = 25
+
+
+def resolve_package(name):
+    """'silver', 'Silver package' or 'C. Silver Package' -> 'silver'; None if unknown."""
+    match = _PACKAGE_PATTERN.search(_normalize(name or ""))
+    return match.group(1) if match else None
+
+
+def resolve_benefit(term):
+    """Benefit name or alias ('dental', 'Dental Care') -> sheet benefit name; None if unknown."""
+    match = _BENEFIT_PATTERN.search(_normalize(term or ""))
+    return BENEFIT_ALIASES[match.group(1)] if match else None
+
+
+def _variant_label(level, pkg):
+    if len(PACKAGE_INDEX[level]) == 1:
+        return level.title()
+    return f"{level.title()} (Network {pkg.get('general_info', {}).get('Network', '?')})"
+
+
+def get_package(level):
+    """Every variant of a package level with its general info and benefits."""
+    return {
+        "package": level,
+        "variants": [
+            {
+                "label": _variant_label(level, pkg),
+                "package_type": pkg.get("package_type", ""),
+                "general_info": pkg.get("general_info", {}),
+                "benefits": pkg.get("benefits", []),
+            }
+            for pkg in PACKAGE_INDEX[level]
+        ],
+    }
+
+
+def compare_packages(levels, benefits=None):
+    """
+    Side-by-side benefit rows for the given package levels.
+
+    `benefits` are sheet benefit names (all benefits when empty). Variants of a level
+    whose rows are identical are reported once under the level's name.
+    """
+    rows = []
+    for benefit in benefits or BENEFIT_NAMES:
+        values = {}
+        for level in levels:
+            entries = BENEFIT_INDEX.get((level, _normalize(benefit)), [])
+            distinct = []
+            for pkg, row in entries:
+                if not any(row == seen for _, seen in distinct):
+                    distinct.append((pkg, row))
+            values[level] = [
+                {
+                    "label": level.title() if len(distinct) == 1 else _variant_label(level, pkg),
+                    "limit": row.get("Limit (SAR)", ""),
+                    "covered_services": row.get("Covered Services", ""),
+                    "description": row.get("Benefit Description", ""),
+                }
+                for pkg, row in distinct
+            ]
+        rows.append({"benefit": benefit, "values": values})
+    return {"packages": list(levels), "benefits": [row["benefit"] for row in rows], "rows": rows}
+
+
+def format_comparison_markdown(comparison):
+    """Markdown table for compare_packages() output, in the style of the chat answers."""
+    lines = [
+        "| Benefit | Package | Limit (SAR) | Covered Services |",
+        "|---|---|---|---|",
+    ]
+    for row in comparison["rows"]:
+        for level in comparison["packages"]:
+            for value in row["values"].get(level, []):
+                lines.append(f"| {row['benefit']} | {value['label']} | {value['limit']} | {value['covered_services']} |")
+    return "\n".join(lines)
+
+
+def answer_package_question(message):
+    """
+    Markdown answer for a simple package/benefit lookup, or None when the question needs
+    the supervisor (no package or benefit named, analysis terms, or too long).
+    """
+    if not PACKAGE_FAST_PATH or not message:
+        return None
+    text = _normalize(message)
+    if len(text.split()) > MAX_LOOKUP_WORDS or _ANALYSIS_PATTERN.search(text):
+        return None
+    levels = list(dict.fromkeys(_PACKAGE_PATTERN.findall(text)))
+    benefits = list(dict.fromkeys(BENEFIT_ALIASES[a] for a in _BENEFIT_PATTERN.findall(text)))
+    if not levels or not benefits:
+        return None
+    packages = ", ".join(level.title() for level in levels)
+    return f"Here is the coverage for **{packages}**:\n\n" + format_comparison_markdown(compare_packages(levels, benefits))
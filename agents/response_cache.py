@@ -0,0 +1,245 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from sqlite_profile import connect_sqlite
+
+# Response cache for the general chat supervisor. Many general chats open with the same
+# product questions ("What's the dental limit on Silver?"), whose answers only depend on
+# the question, the package data and the prompt. Two layers:
+#   exact    - in-memory LRU keyed on (version, normalized question), with a TTL
+#   semantic - optional; question embeddings in a sqlite-vec table, a hit needs cosine
+#              similarity >= RESPONSE_CACHE_SIMILARITY (same version, within the TTL)
+# Callers must only use it for a chat's first question: once a thread has history the
+# answer may depend on it.
+#
+# RESPONSE_CACHE_ENABLED=true
+# RESPONSE_CACHE_MAX_SIZE=1024           entries per layer, least recently used evicted first
+# RESPONSE_CACHE_TTL_SECONDS=86400
+# RESPONSE_CACHE_SEMANTIC=false          needs sqlite-vec and an SQLite that can load extensions
+# RESPONSE_CACHE_SIMILARITY=0.95
+# RESPONSE_CACHE_EMBEDDING_MODEL=text-embedding-3-small
+# RESPONSE_CACHE_DB_PATH=database/response_cache.db
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_SIZE = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", "1024"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+RESPONSE_CACHE_SEMANTIC = os.getenv("RESPONSE_CACHE_SEMANTIC", "false").lower() == "true"
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))
+RESPONSE_CACHE_EMBEDDING_MODEL = os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "text-embedding-3-small")
+RESPONSE_CACHE_DB_PATH = os.getenv("RESPONSE_CACHE_DB_PATH", "database/response_cache.db")
+
+EMBEDDING_DIMENSIONS = {"text-embedding-3-small": 1536, "text-embedding-3-large": 3072, "text-embedding-ada-002": 1536}
+
+
+def normalize_question(text):
+    """Lowercase, unify quotes/whitespace and drop trailing punctuation."""
+    text = unicodedata.normalize("NFKC", text or "")
+    text = text.replace("’", "'").replace("‘", "'").replace("“", '"').replace("”", '"')
+    text = re.sub(r"\s+", " ", text).strip().lower()
+    return text.rstrip("?!.؟ ")
+
+
+class SemanticResponseStore:
+    """Question embeddings and answers in SQLite, nearest-neighbour search through sqlite-vec."""
+
+    def __init__(self, path, embeddings, dimensions, max_size, ttl_seconds):
+        import sqlite_vec
+
+        self.embeddings = embeddings
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._serialize = sqlite_vec.serialize_float32
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = connect_sqlite(path, check_same_thread=False)
+        self.conn.enable_load_extension(True)
+        sqlite_vec.load(self.conn)
+        self.conn.enable_load_extension(False)
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS cached_responses (
+                id INTEGER PRIMARY KEY,
+                version TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS cached_response_vectors USING vec0(
+                embedding float[{dimensions}] distance_metric=cosine
+            );
+        """)
+        self.conn.commit()
+
+    def lookup(self, version, question):
+        """Closest cached (similarity, answer) for this version, or None."""
+        vector = self._serialize(self.embeddings.embed_query(question))
+        now = time.time()
+        with self._lock:
+            # Over-fetch a little: the nearest vectors may belong to an older version
+            rows = self.conn.execute(
+                """
+                SELECT r.id, r.answer, v.distance
+                FROM (SELECT rowid, distance FROM cached_response_vectors
+                      WHERE embedding MATCH ? AND k = 8) v
+                JOIN cached_responses r ON r.id = v.rowid
+                WHERE r.version = ? AND r.created_at >= ?
+                ORDER BY v.distance
+                LIMIT 1
+                """,
+                (vector, version, now - self.ttl_seconds),
+            ).fetchall()
+            if not rows:
+                return None
+            row_id, answer, distance = rows[0]
+            similarity = 1.0 - distance
+            if similarity < RESPONSE_CACHE_SIMILARITY:
+                return None
+            self.conn.execute("UPDATE cached_responses SET last_used_at = ? WHERE id = ?", (now, row_id))
+            self.conn.commit()
+            return similarity, answer
+
+    def store(self, version, question, answer):
+        vector = self._serialize(self.embeddings.embed_query(question))
+        now = time.time()
+        with self._lock:
+            cur = self.conn.execute(
+                "INSERT INTO cached_responses (version, question, answer, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (version, question, answer, now, now),
+            )
+            self.conn.execute("INSERT INTO cached_response_vectors (rowid, embedding) VALUES (?, ?)",
+                              (cur.lastrowid, vector))
+            # Expired, stale-version and least recently used rows beyond max_size go
+            stale = [row[0] for row in self.conn.execute(
+                """
+                SELECT id FROM cached_responses
+                WHERE created_at < ? OR version != ?
+                UNION
+                SELECT id FROM (SELECT id FROM cached_responses ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)
+                """,
+                (now - self.ttl_seconds, version, self.max_size),
+            )]
+            for row_id in stale:
+                self.conn.execute("DELETE FROM cached_response_vectors WHERE rowid = ?", (row_id,))
+                self.conn.execute("DELETE FROM cached_responses WHERE id = ?", (row_id,))
+            self.conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM cached_response_vectors")
+            self.conn.execute("DELETE FROM cached_responses")
+            self.conn.commit()
+
+
+class ResponseCache:
+    """Exact (in-memory) plus optional semantic (sqlite-vec) cache of first-turn answers."""
+
+    def __init__(self, version, max_size=RESPONSE_CACHE_MAX_SIZE, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+                 semantic=RESPONSE_CACHE_SEMANTIC):
+        # Bump the version whenever something the answers depend on changes (package data, prompt)
+        self.version = version
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # normalized question -> (created_at, answer)
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "bypasses": 0, "stores": 0}
+        self.semantic = None
+        if semantic:
+            self.semantic = self._create_semantic_store()
+
+    def _create_semantic_store(self):
+        if not hasattr(sqlite3.Connection, "enable_load_extension"):
+            print("[response-cache] semantic layer disabled: this Python's sqlite3 cannot load extensions")
+            return None
+        try:
+            from agents.llm_clients import get_embeddings
+
+            embeddings = get_embeddings(RESPONSE_CACHE_EMBEDDING_MODEL)
+            return SemanticResponseStore(
+                RESPONSE_CACHE_DB_PATH, embeddings,
+                EMBEDDING_DIMENSIONS.get(RESPONSE_CACHE_EMBEDDING_MODEL, 1536),
+                self.max_size, self.ttl_seconds,
+            )
+        except (ImportError, sqlite3.Error) as e:
+            print(f"[response-cache] semantic layer disabled: {e!r}")
+            return None
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+            stats = dict(self.stats)
+        return stats
+
+    def record_bypass(self):
+        """Count a request that skipped the cache because the thread already had context."""
+        self._count("bypasses")
+
+    def lookup(self, question):
+        """Cached answer for a first question, or None."""
+        if not RESPONSE_CACHE_ENABLED:
+            return None
+        key = normalize_question(question)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, answer = entry
+                if now - created_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.stats["exact_hits"] += 1
+                    print(f"[response-cache] exact hit {self.stats}")
+                    return answer
+                del self._entries[key]
+
+        if self.semantic is not None:
+            try:
+                match = self.semantic.lookup(self.version, key)
+            except Exception as e:
+                print(f"[response-cache] semantic lookup failed: {e!r}")
+                match = None
+            if match is not None:
+                similarity, answer = match
+                self._put(key, answer)
+                print(f"[response-cache] semantic hit ({similarity:.3f}) {self._count('semantic_hits')}")
+                return answer
+
+        print(f"[response-cache] miss {self._count('misses')}")
+        return None
+
+    def _put(self, key, answer):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def store(self, question, answer):
+        """Remember the answer to a first question."""
+        if not RESPONSE_CACHE_ENABLED or not answer:
+            return
+        key = normalize_question(question)
+        self._put(key, answer)
+        self._count("stores")
+        if self.semantic is not None:
+            try:
+                self.semantic.store(self.version, key, answer)
+            except Exception as e:
+                print(f"[response-cache] semantic store failed: {e!r}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.semantic is not None:
+            self.semantic.clear()
+
+    def snapshot(self):
+        """Hit/miss counters plus the exact layer's size."""
+        with self._lock:
+            lookups = self.stats["exact_hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+            hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+            return {**self.stats, "size": len(self._entries), "hit_rate": hits / lookups if lookups else 0.0}
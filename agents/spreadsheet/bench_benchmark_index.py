@@ -0,0 +1,83 @@
+"""
+Micro-benchmark for the benchmark lookup inside assess_new_offer.
+
+Scales test_historical.xlsx up to ~1M rows and compares the per-call cost of the
+previous pandas filtering (region + package, then the all-region alternative and
+Basic fallback scans) against lookups in the precomputed benchmark index.
+
+Run from the repository root:
+    python -m agents.spreadsheet.bench_benchmark_index [rows]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from agents.spreadsheet.spreadsheet_agent import (
+    df,
+    build_benchmark_index,
+    normalize_region,
+    package_level,
+    REGION_COL,
+    PACKAGE_COL,
+    LIVES_COL,
+    LR_COL,
+    PREMIUM_COL,
+    CLAIMS_COL,
+)
+
+
+def filter_lookup(data, region, package, alt_package):
+    """The per-call filtering assess_new_offer used before the index existed."""
+    region_matches = data[data[REGION_COL].str.lower() == region.lower()]
+    matches = region_matches[region_matches[PACKAGE_COL].str.lower().str.contains(package.lower(), na=False)]
+    benchmark = (
+        matches[LIVES_COL].mean(),
+        matches[LR_COL].mean(),
+        matches[PREMIUM_COL].mean(),
+        matches[CLAIMS_COL].sum() / matches[LIVES_COL].sum(),
+    )
+    alt_matches = data[data[PACKAGE_COL].str.lower().str.contains(alt_package.lower(), na=False)]
+    alt_claims = alt_matches[CLAIMS_COL].sum() / alt_matches[LIVES_COL].sum()
+    basic_matches = data[data[PACKAGE_COL].str.lower().str.contains("basic", na=False)]
+    basic_claims = basic_matches[CLAIMS_COL].sum() / basic_matches[LIVES_COL].sum()
+    return benchmark, alt_claims, basic_claims
+
+
+def index_lookup(index, region, package, alt_package):
+    benchmark = index[(normalize_region(region), package_level(package))]
+    alt_claims = index[(None, package_level(alt_package))]['avg_claims_per_life']
+    basic_claims = index[(None, 'basic')]['avg_claims_per_life']
+    return benchmark, alt_claims, basic_claims
+
+
+def per_call_ms(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main(target_rows=1_000_000):
+    if df.empty:
+        print("test_historical.xlsx not loaded; run from the repository root.")
+        return
+
+    repeats = max(1, target_rows // len(df))
+    data = pd.concat([df] * repeats, ignore_index=True)
+    print(f"Rows: {len(data):,}")
+
+    start = time.perf_counter()
+    index = build_benchmark_index(data)
+    print(f"Index build (once at load): {(time.perf_counter() - start) * 1000:.1f} ms, {len(index)} keys")
+
+    args = ("Central", "Gold", "Silver")
+    before = per_call_ms(lambda: filter_lookup(data, *args), calls=5)
+    after = per_call_ms(lambda: index_lookup(index, *args), calls=100_000)
+    print(f"Per-call lookup, pandas filtering: {before:.2f} ms")
+    print(f"Per-call lookup, benchmark index:  {after * 1000:.2f} µs")
+    print(f"Speed-up: {before / after:,.0f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
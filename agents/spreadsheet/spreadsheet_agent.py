@@ -44,6 +44,74 @@ PACKAGE_HIERARCHY = {
     "basic": 1
 }
 
+# Columns used by assess_new_offer (exact names from the spreadsheet)
+REGION_COL = 'Contract Region'
+PACKAGE_COL = 'Product Package'
+LIVES_COL = 'Earned Exposure'
+LR_COL = 'Loss Ratio'
+PREMIUM_COL = 'Average Premium'
+CLAIMS_COL = 'Claims'
+REQUIRED_COLUMNS = [REGION_COL, PACKAGE_COL, LIVES_COL, LR_COL, PREMIUM_COL, CLAIMS_COL]
+
+def normalize_region(region) -> str:
+    return str(region).strip().lower()
+
+def package_level(package):
+    """Map a package name or sheet label (e.g. 'D. Gold Package') to its hierarchy key."""
+    label = str(package).strip().lower()
+    for level in PACKAGE_HIERARCHY:
+        if level in label:
+            return level
+    return None
+
+def build_benchmark_index(data: pd.DataFrame) -> dict:
+    """
+    Precompute historical benchmarks once so offer assessment is a dict lookup.
+
+    Keys are (normalized region, package level); (None, package level) holds the
+    all-region aggregate used for alternative and fallback packages. Each value has
+    benchmark_lives, avg_loss_ratio, avg_premium and avg_claims_per_life.
+    """
+    if data.empty or any(col not in data.columns for col in REQUIRED_COLUMNS):
+        return {}
+
+    # Resolve each distinct package label once instead of once per row
+    labels = data[PACKAGE_COL].dropna().unique()
+    level_by_label = {label: package_level(label) for label in labels}
+
+    frame = pd.DataFrame({
+        'region': data[REGION_COL].map(normalize_region, na_action='ignore'),
+        'level': data[PACKAGE_COL].map(level_by_label),
+        'lives': data[LIVES_COL],
+        'loss_ratio': data[LR_COL],
+        'premium': data[PREMIUM_COL],
+        'claims': data[CLAIMS_COL],
+    }).dropna(subset=['level'])
+
+    index = {}
+    for keys, region_key in ((['region', 'level'], True), (['level'], False)):
+        grouped = frame.groupby(keys).agg(
+            benchmark_lives=('lives', 'mean'),
+            avg_loss_ratio=('loss_ratio', 'mean'),
+            avg_premium=('premium', 'mean'),
+            lives_sum=('lives', 'sum'),
+            claims_sum=('claims', 'sum'),
+        )
+        grouped['avg_claims_per_life'] = grouped['claims_sum'] / grouped['lives_sum']
+        for key, row in grouped.iterrows():
+            index_key = key if region_key else (None, key)
+            index[index_key] = {
+                'benchmark_lives': row['benchmark_lives'],
+                'avg_loss_ratio': row['avg_loss_ratio'],
+                'avg_premium': row['avg_premium'],
+                'avg_claims_per_life': row['avg_claims_per_life'],
+            }
+    return index
+
+BENCHMARK_INDEX = build_benchmark_index(df)
+AVAILABLE_REGIONS = df[REGION_COL].unique() if REGION_COL in df.columns else []
+AVAILABLE_PACKAGES = df[PACKAGE_COL].unique() if PACKAGE_COL in df.columns else []
+
 def get_alternative_package(current_package: str) -> str:
     """Get the next lower package in the hierarchy"""
     current_level = PACKAGE_HIERARCHY.get(current_package.lower())
@@ -73,50 +141,22 @@ def assess_new_offer(
     if df.empty:
         return "❌ No historical data available. Please ensure the spreadsheet is properly loaded."
     
-    # Print available columns for debugging
-    # print(f"Available columns: {list(df.columns)}")
-    
-    # Try to find the right columns (case-insensitive matching)
-    region_col = 'Contract Region'  # Exact match from spreadsheet
-    package_col = 'Product Package'  # Exact match from spreadsheet  
-    lives_col = 'Earned Exposure'    # Exact match from spreadsheet
-    lr_col = 'Loss Ratio'           # Exact match from spreadsheet
-    premium_col = 'Average Premium'  # Exact match from spreadsheet
-    claims_col = 'Claims'           # Exact match from spreadsheet
-    
     # Verify columns exist
-    missing_cols = []
-    for col_name, col_var in [('Contract Region', region_col), ('Product Package', package_col), 
-                              ('Earned Exposure', lives_col), ('Loss Ratio', lr_col),
-                              ('Average Premium', premium_col), ('Claims', claims_col)]:
-        if col_var not in df.columns:
-            missing_cols.append(col_name)
-    
+    missing_cols = [col for col in REQUIRED_COLUMNS if col not in df.columns]
     if missing_cols:
         return f"❌ Missing required columns: {', '.join(missing_cols)}. Available columns: {list(df.columns)}"
     
-    # Filter data (handle package names with prefixes like "D. Gold Package")
-    try:
-        region_matches = df[df[region_col].str.lower() == region.lower()]
-        # For packages, check if the package name is contained in the full package name
-        package_matches = region_matches[region_matches[package_col].str.lower().str.contains(package.lower(), na=False)]
-        matches = package_matches
-    except Exception as e:
-        return f"❌ Error filtering data: {str(e)}"
-
-    if matches.empty:
-        available_regions = df[region_col].unique()
-        available_packages = df[package_col].unique()
-        return f"❌ No historical data for {region}/{package} combination.\nAvailable regions: {available_regions}\nAvailable packages: {available_packages}"
+    # Look up precomputed benchmarks (package names with prefixes like "D. Gold Package" are
+    # resolved to their hierarchy level when the index is built)
+    benchmark = BENCHMARK_INDEX.get((normalize_region(region), package_level(package)))
+    if benchmark is None:
+        return f"❌ No historical data for {region}/{package} combination.\nAvailable regions: {AVAILABLE_REGIONS}\nAvailable packages: {AVAILABLE_PACKAGES}"
 
     # --- Historical Benchmarks ---
-    try:
-        benchmark_lives = matches[lives_col].mean()
-        avg_loss_ratio = matches[lr_col].mean() if lr_col else None
-        avg_premium = matches[premium_col].mean() if premium_col else None
-        avg_claims_per_life = (matches[claims_col].sum() / matches[lives_col].sum()) if claims_col else None
-    except Exception as e:
-        return f"❌ Error calculating benchmarks: {str(e)}"
+    benchmark_lives = benchmark['benchmark_lives']
+    avg_loss_ratio = benchmark['avg_loss_ratio']
+    avg_premium = benchmark['avg_premium']
+    avg_claims_per_life = benchmark['avg_claims_per_life']
 
     # --- Input-derived Values ---
     offered_budget = lives * budget_per_life  # Total budget for all lives
@@ -178,9 +218,9 @@ def assess_new_offer(
         print(f"Alternative package suggested: {alt_package}")
         if alt_package:
             try:
-                alt_matches = df[df[package_col].str.lower().str.contains(alt_package.lower(), na=False)]
-                if not alt_matches.empty:
-                    alt_claims_per_life = (alt_matches[claims_col].sum() / alt_matches[lives_col].sum()) if claims_col else None
+                alt_benchmark = BENCHMARK_INDEX.get((None, package_level(alt_package)))
+                if alt_benchmark is not None:
+                    alt_claims_per_life = alt_benchmark['avg_claims_per_life']
                     alt_true_cost = alt_target_price = alt_expected_lr = None
                     if (alt_claims_per_life is not None) and (target_lr > 0):
                         alt_true_cost    = alt_claims_per_life / target_lr
@@ -209,9 +249,9 @@ def assess_new_offer(
                     
                     # If alternative is still over budget, calculate Basic package as fallback
                     if alt_target_price > offered_budget_per_life and alt_package.lower() != "basic":
-                        basic_matches = df[df[package_col].str.lower().str.contains("basic", na=False)]
-                        if not basic_matches.empty:
-                            basic_claims_per_life = (basic_matches[claims_col].sum() / basic_matches[lives_col].sum()) if claims_col else None
+                        basic_benchmark = BENCHMARK_INDEX.get((None, "basic"))
+                        if basic_benchmark is not None:
+                            basic_claims_per_life = basic_benchmark['avg_claims_per_life']
                             basic_true_cost = basic_target_price = basic_expected_lr = None
                             if (basic_claims_per_life is not None) and (target_lr > 0):
                                 basic_true_cost    = basic_claims_per_life / target_lr
@@ -2,8 +2,10 @@
 
 #first function: --> extract transcript from chat messages
 #second function: --> generate summary from transcript
-from langchain_openai import ChatOpenAI
-import os
+import hashlib
+
+from agents.llm_clients import get_chat_model
+from agents.llm_scheduler import deduplicate
 
 
 def extract_transcript(chat_messages):
@@ -51,7 +53,43 @@ Transcript:
 {transcript}
 
 Summary:"""
-    llm = ChatOpenAI(model='gpt-4o', temperature=0.2, api_key=os.getenv('OPENAI_API_KEY'))
+    return _invoke_once(prompt)
+
+
+def update_summary(previous_summary, transcript):
+    """
+    Fold new conversation messages into an existing summary using an LLM.
     
-    response = llm.invoke(prompt)
+    Args:
+        previous_summary: str - The current summary
+        transcript: str - Formatted transcript of only the messages since that summary
+        
+    Returns:
+        str: Updated summary of the conversation
+    """
+    prompt = f"""You are a helpful assistant that keeps conversation summaries up to date.
+
+Here is the current summary of a conversation with a client, followed by the messages
+exchanged since it was written. Rewrite the summary so it also covers the new messages.
+Keep it concise and make sure it still includes:
+- Client name if available
+- Key topics discussed
+- Action items or next steps
+- Important decisions made
+
+Current summary:
+{previous_summary}
+
+New messages:
+{transcript}
+
+Updated summary:"""
+    return _invoke_once(prompt)
+
+
+def _invoke_once(prompt):
+    """Run the summary prompt; identical prompts already in flight share one LLM call."""
+    llm = get_chat_model('gpt-4o', temperature=0.2)
+    key = "summary:" + hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    response = deduplicate(key, llm.invoke, prompt)
     return response.content if hasattr(response, 'content') else str(response)
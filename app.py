@@ -1,18 +1,28 @@
 # app.py
 from webbrowser import get
 from agents.agent import llm, get_supervisor_for_user
-from agents.summary.summary_agent import extract_transcript, generate_summary
+from agents.summary.summary_agent import extract_transcript, generate_summary, update_summary
 from agents.manager_agent import create_manager_agent
-from agents.general_agent import supervisor_agent_general
+from agents.general_agent import general_response_cache, supervisor_agent_general
+from agents.package_detals.package_query import PACKAGE_LEVELS, answer_package_question, compare_packages, get_package, resolve_benefit, resolve_package
+from agents.checkpointer import get_checkpointer
+from agents.checkpoint_serde import ZstdCheckpointSerializer, recompress_checkpoints, train_checkpoint_dictionary
+from agents.checkpoint_retention import CHECKPOINT_KEEP_LAST, delete_checkpoint_threads, run_checkpoint_maintenance, start_checkpoint_maintenance
 from dotenv import load_dotenv
-import os, tempfile, time, json, subprocess
+import os, tempfile, time, json, subprocess, hashlib, threading, base64
+from concurrent.futures import ThreadPoolExecutor
 # import logging
 from langchain_openai import ChatOpenAI
+from langchain_core.messages import AIMessage, HumanMessage
 from pathlib import Path
 from werkzeug.utils import secure_filename
 from flask import send_file
-from openai import OpenAI
-client = OpenAI()
+from agents.llm_clients import get_openai_client
+from agents.llm_scheduler import SUMMARY, TRANSCRIPTION, llm_priority
+from agents.notification_events import NOTIFICATION_HEARTBEAT_SECONDS, NOTIFICATION_LONG_POLL_SECONDS, notification_broker
+from agents.notification_helper import get_unread_notifications, mark_notifications_read, notification_etag, notification_payload, record_notification_created, record_notification_deactivated
+# Shared, connection-pooled client (see agents/llm_clients.py)
+client = get_openai_client()
 
 # Set logging level to suppress langgraph debug messages
 # logging.getLogger('langgraph').setLevel(logging.ERROR)
@@ -21,11 +31,14 @@ client = OpenAI()
 load_dotenv()
 
 import io
-from flask import Flask, render_template, request, redirect, url_for, flash,jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash,jsonify, Response, stream_with_context
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
-from models import db, User, ChatSession, ChatMessage, ClientSummary, TeamNotification, NotificationRead, Transcript
+from migrations import run_migrations, check_query_plans
+from sqlite_profile import install_sqlite_pragmas
+from models import db, User, ChatSession, ChatMessage, ClientSummary, TeamNotification, Transcript, TranscriptionJob
 from datetime import datetime
 import uuid
+import click
 import pandas as pd
 import traceback
 from reportlab.pdfgen import canvas
@@ -49,6 +62,8 @@ app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///users.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db.init_app(app)
+with app.app_context():
+    install_sqlite_pragmas(db.engine)
 
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -119,7 +134,7 @@ def get_manager_agent():
     if manager_agent is None:
         # Create manager agent within app context
         with app.app_context():
-            manager_agent = create_manager_agent(llm=llm).compile()
+            manager_agent = create_manager_agent(llm=llm).compile(checkpointer=get_checkpointer())
     return manager_agent
 
 # --- helper: optional diarization via pyannote (set HUGGINGFACE_TOKEN) ---
@@ -251,6 +266,59 @@ def get_clients_for_user(user_id):
     return [{'name': client[0]} for client in clients if client[0]]
 
 
+# --- home page team sidebar: cached per user, rebuilt when summaries or assignments change ---
+HOME_SIDEBAR_CACHE_TTL_SECONDS = float(os.getenv("HOME_SIDEBAR_CACHE_TTL_SECONDS", "300"))
+
+_home_sidebar_cache = {}  # user_id -> (created_at, sales_agents)
+_home_sidebar_generation = 0
+_home_sidebar_lock = threading.Lock()
+
+def invalidate_home_sidebar():
+    """Drop every cached team sidebar (a summary, agent or assignment changed)."""
+    global _home_sidebar_generation
+    with _home_sidebar_lock:
+        _home_sidebar_generation += 1
+        _home_sidebar_cache.clear()
+
+def _load_home_sales_agents(user):
+    """Sales agents with their manager and client summaries in two queries, whatever the team size."""
+    # Managers see only their assigned agents, SME Leaders see all agents
+    if user.role == 'manager':
+        agent_query = User.query.filter_by(manager_id=user.id, role='salesagent')
+    else:  # smeleader
+        agent_query = User.query.filter_by(role='salesagent')
+    agents = agent_query.options(db.joinedload(User.manager)).order_by(User.id).all()
+
+    summaries_by_agent = {}
+    summaries = ClientSummary.query.filter(
+        ClientSummary.user_id.in_(agent_query.with_entities(User.id)),
+        ClientSummary.summary != ''
+    ).order_by(ClientSummary.id).all()
+    for s in summaries:
+        summaries_by_agent.setdefault(s.user_id, []).append({'client_name': s.client_name, 'summary': s.summary})
+
+    return [{
+        'id': agent.id,
+        'username': agent.username,
+        'manager_name': agent.manager_name,
+        'summaries': summaries_by_agent.get(agent.id, [])
+    } for agent in agents]
+
+def get_home_sales_agents(user):
+    now = time.monotonic()
+    with _home_sidebar_lock:
+        entry = _home_sidebar_cache.get(user.id)
+        if entry is not None and now - entry[0] < HOME_SIDEBAR_CACHE_TTL_SECONDS:
+            return entry[1]
+        generation = _home_sidebar_generation
+
+    sales_agents = _load_home_sales_agents(user)
+    with _home_sidebar_lock:
+        # Don't cache a result an invalidation raced with
+        if generation == _home_sidebar_generation:
+            _home_sidebar_cache[user.id] = (now, sales_agents)
+    return sales_agents
+
 @app.route('/')
 @login_required
 def home():
@@ -270,22 +338,7 @@ def home():
     # Get sales agents if current user is a manager or SME leader
     sales_agents = None
     if current_user.role in ['manager', 'smeleader']:
-        sales_agents = []
-        
-        # Managers see only their assigned agents, SME Leaders see all agents
-        if current_user.role == 'manager':
-            agent_query = current_user.get_managed_agents()
-        else:  # smeleader
-            agent_query = User.query.filter_by(role='salesagent').all()
-            
-        for agent in agent_query:
-            summaries = ClientSummary.query.filter_by(user_id=agent.id).all()
-            sales_agents.append({
-                'id': agent.id,
-                'username': agent.username,
-                'manager_name': agent.manager_name,
-                'summaries': [{'client_name': s.client_name, 'summary': s.summary} for s in summaries]
-            })
+        sales_agents = get_home_sales_agents(current_user)
     
     return render_template('chat.html', username=current_user.username, role=current_user.role,
                          user_id=current_user.id, clients=clients, recent_chats=recent_chats,
@@ -297,6 +350,7 @@ def admin():
     return f"Hello Admin {current_user.username}, this is a protected admin page."
 
 from dashboard.stats import get_sales_agents_client_stats, get_total_clients, get_dashboard_summary, get_seller_productivity, get_predictions_data
+from dashboard.sme_charts import SME_CHARTS, get_sme_chart, get_sme_charts
 
 @app.route('/api/team-message', methods=['POST'])
 @management_required
@@ -318,19 +372,98 @@ def create_team_message():
     )
     db.session.add(notification)
     db.session.commit()
+
+    # Bumps every user's notification version, so cached supervisors rebuild their prompt
+    record_notification_created(notification)
+    notification_broker.publish({'type': 'created', 'notification': notification_payload(notification)})
     
     return jsonify({'success': True, 'message': 'Notification sent successfully'})
 
+@app.route('/api/team-message/<int:notification_id>/deactivate', methods=['POST'])
+@management_required
+def deactivate_team_message(notification_id):
+    notification = db.session.get(TeamNotification, notification_id)
+    if not notification:
+        return jsonify({'error': 'Notification not found'}), 404
+
+    if notification.is_active:
+        notification.is_active = False
+        db.session.commit()
+        record_notification_deactivated(notification_id)
+        notification_broker.publish({'type': 'deactivated', 'id': notification_id})
+
+    return jsonify({'success': True})
+
 @app.route('/api/notifications/unread', methods=['GET'])
 @login_required
 def get_unread_notifications_endpoint():
-    from agents.notification_helper import get_unread_notifications
-    # print(f"Fetching unread notifications for user {current_user.id}")
-    
-    notifications = get_unread_notifications(current_user.id)
-    # print(f"Found {len(notifications)} unread notifications")
-    
-    return jsonify(notifications)
+    # Conditional GET: unchanged lists cost a version lookup and a 304
+    etag = notification_etag(current_user.id)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(get_unread_notifications(current_user.id))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/api/notifications/stream', methods=['GET'])
+@login_required
+def notifications_stream():
+    """Push notification changes as Server-Sent Events.
+
+    Starts with a ``snapshot`` event (the unread list), then sends ``created``,
+    ``deactivated`` and ``read`` events as they happen, each with its broker sequence
+    number as the event id. A reconnecting EventSource resumes from Last-Event-ID;
+    when that is out of the broker's reach it gets a fresh snapshot instead.
+    """
+    user_id = current_user.id
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    since = notification_broker.seq if last_event_id is None else last_event_id
+    # Read the unread list before anything that happens after `since`
+    snapshot = get_unread_notifications(user_id) if last_event_id is None else None
+    db.session.remove()  # don't hold a DB connection for the life of the stream
+
+    def generate():
+        nonlocal since
+        if snapshot is not None:
+            yield f"id: {since}\n" + _sse_event("snapshot", snapshot)
+        while True:
+            seq, events = notification_broker.wait(since, user_id, NOTIFICATION_HEARTBEAT_SECONDS)
+            if events is None:
+                with app.app_context():
+                    unread = get_unread_notifications(user_id)
+                yield f"id: {seq}\n" + _sse_event("snapshot", unread)
+            elif not events:
+                yield ": keep-alive\n\n"
+            for event_seq, event in events or ():
+                yield f"id: {event_seq}\n" + _sse_event(event['type'], event)
+            since = seq
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/notifications/poll', methods=['GET'])
+@login_required
+def notifications_poll():
+    """Long-poll fallback for clients without EventSource.
+
+    Without ``since`` (or when it is out of the broker's reach) returns the unread
+    list as ``snapshot``; otherwise waits up to NOTIFICATION_LONG_POLL_SECONDS for
+    events after ``since``. Pass the returned ``seq`` as ``since`` on the next call.
+    """
+    user_id = current_user.id
+    since = request.args.get('since', type=int)
+    if since is not None:
+        db.session.remove()
+        seq, events = notification_broker.wait(since, user_id, NOTIFICATION_LONG_POLL_SECONDS)
+        if events is not None:
+            return jsonify({'seq': seq, 'events': [event for _, event in events]})
+    seq = notification_broker.seq
+    return jsonify({'seq': seq, 'snapshot': get_unread_notifications(user_id)})
 
 @app.route('/api/notifications/mark-read', methods=['POST'])
 @login_required
@@ -339,15 +472,41 @@ def mark_notification_read():
     if not notification_id:
         return jsonify({'error': 'Notification ID required'}), 400
         
-    read_record = NotificationRead(
-        notification_id=notification_id,
-        user_id=current_user.id
-    )
-    db.session.add(read_record)
-    db.session.commit()
+    try:
+        notification_id = int(notification_id)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid notification ID'}), 400
+
+    # Idempotent: a second click or another tab finds the receipt already there
+    marked = mark_notifications_read(current_user.id, [notification_id])
+    if marked:
+        # Clears it in the user's other tabs
+        notification_broker.publish({'type': 'read', 'ids': marked}, user_id=current_user.id)
     
     return jsonify({'success': True})
 
+@app.route('/api/notifications/mark-read/bulk', methods=['POST'])
+@login_required
+def mark_notifications_read_bulk():
+    """Mark a list of notifications (``notification_ids``) or all of them (``all: true``) read."""
+    data = request.json or {}
+    if data.get('all'):
+        notification_ids = None
+    else:
+        notification_ids = data.get('notification_ids')
+        if not isinstance(notification_ids, list) or not notification_ids:
+            return jsonify({'error': 'notification_ids (a list) or all=true required'}), 400
+        try:
+            notification_ids = [int(i) for i in notification_ids]
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid notification ID'}), 400
+
+    marked = mark_notifications_read(current_user.id, notification_ids)
+    if marked:
+        notification_broker.publish({'type': 'read', 'ids': marked}, user_id=current_user.id)
+
+    return jsonify({'success': True, 'marked': marked})
+
 @app.route('/manager/dashboard')
 @management_required
 def manager_dashboard():
@@ -413,7 +572,7 @@ def create_agent_summary_chat(agent_id):
         return jsonify({'error': 'Access denied: You can only view your assigned agents'}), 403
     
     # Get all client summaries for this agent
-    summaries = ClientSummary.query.filter_by(user_id=agent_id).all()
+    summaries = ClientSummary.query.filter(ClientSummary.user_id == agent_id, ClientSummary.summary != '').all()
     
     # Format the summary message
     message = f"In summary, Agent {agent.username} is working on {len(summaries)} active clients.\n\nHere are the updates:\n"
@@ -507,6 +666,7 @@ def register():
         new_user.set_password(password)
         db.session.add(new_user)
         db.session.commit()
+        invalidate_home_sidebar()
         flash('Registration successful! Please login.')
         return redirect(url_for('login'))
 
@@ -551,29 +711,14 @@ def manage_users():
                 db.session.delete(user)
                 db.session.commit()
 
+        invalidate_home_sidebar()
+
     users = User.query.all()
     return render_template('admin_users.html', users=users)
 
 
-@app.route("/v1/chat/agent", methods=['POST'])
-@login_required
-def agent_chat():
-    data = request.json
-    chat_id = data['chat_id']
-    user_message = data['message']
-
-    # Save user message
-    user_msg = ChatMessage(
-        session_id=chat_id,
-        user_id=current_user.id,
-        message=user_message,
-        sender='user'
-    )
-    db.session.add(user_msg)
-
-    # Get the chat session to check if it's a client chat
-    chat_session = ChatSession.query.get(chat_id)
-    
+def _select_chat_agent(chat_id, user_message, chat_session):
+    """Pick the agent for this chat and build its input state."""
     # Choose agent based on context and role
     if current_user.role in ['manager', 'smeleader']:
         # Get or create manager agent with current dashboard data
@@ -583,32 +728,67 @@ def agent_chat():
         chat_history = ChatMessage.query.filter_by(session_id=chat_id).order_by(ChatMessage.timestamp).all()
         messages = []
         
-        # Include first message (summary) and user's new message
-        if chat_history:
+        # Include first message (summary) and user's new message; once the thread has
+        # checkpointed state the summary is already part of it
+        thread_state = agent.get_state({"configurable": {"thread_id": chat_id}})
+        if chat_history and not thread_state.values.get("messages"):
             first_message = chat_history[0]
             if first_message.sender == 'bot':
                 messages.append({"role": "system", "content": f"Previous context - Agent Summary: {first_message.message}"})
         
         messages.append({"role": "user", "content": user_message})
-        
-        # Run the bot with context
-        result = agent.invoke({
-            "messages": messages
-        }, config={"configurable": {"thread_id": chat_id}})
+        return agent, {"messages": messages}
     elif chat_session and chat_session.client_name:  # client-specific chat
-        # Create a new supervisor agent specifically for this client chat
+        # Cached supervisor agent for this user's client chats
         agent = get_supervisor_for_user(user_id=str(current_user.id))
-        
-        result = agent.invoke({
-            "messages": [{"role": "user", "content": user_message}]
-        }, config={"configurable": {"thread_id": chat_id}})
     else:  # general chat for sales agents and other roles
         agent = supervisor_agent_general
-        result = agent.invoke({
-            "messages": [{"role": "user", "content": user_message}]
-        }, config={"configurable": {"thread_id": chat_id}})
+    return agent, {"messages": [{"role": "user", "content": user_message}]}
+
+def _record_exchange_in_thread(agent, chat_id, user_message, ai_response):
+    """Append a Q/A pair answered outside the graph, so follow-up questions keep the context."""
+    agent.update_state(
+        {"configurable": {"thread_id": chat_id}},
+        {"messages": [HumanMessage(content=user_message), AIMessage(content=ai_response)]},
+        as_node="supervisor"
+    )
 
-    ai_response = result['messages'][-1].content
+def _general_fast_answer(agent, chat_id, user_message):
+    """
+    Answer a general-chat message without the LLM when possible.
+
+    Only a chat's first question is answered here: a simple package lookup from the
+    package index, anything else possibly from the general response cache. Returns
+    (answer, cacheable): answer is None when the supervisor has to run, and cacheable
+    tells whether its answer may be stored (only when the thread had no history).
+    """
+    if agent is not supervisor_agent_general:
+        return None, False
+    if agent.get_state({"configurable": {"thread_id": chat_id}}).values.get("messages"):
+        # Earlier turns can change the answer ("and for the family members?")
+        general_response_cache.record_bypass()
+        return None, False
+
+    answer = answer_package_question(user_message)
+    if answer is not None:
+        _record_exchange_in_thread(agent, chat_id, user_message, answer)
+        return answer, False
+    answer = general_response_cache.lookup(user_message)
+    if answer is None:
+        return None, True
+    _record_exchange_in_thread(agent, chat_id, user_message, answer)
+    return answer, False
+
+def _save_chat_exchange(chat_id, chat_session, user_message, ai_response):
+    """Persist a user/bot message pair and refresh the client summary when due."""
+    # Save user message
+    user_msg = ChatMessage(
+        session_id=chat_id,
+        user_id=current_user.id,
+        message=user_message,
+        sender='user'
+    )
+    db.session.add(user_msg)
 
     # Save bot response
     bot_msg = ChatMessage(
@@ -619,42 +799,118 @@ def agent_chat():
     )
     db.session.add(bot_msg)
 
-    # Update client summary counter if this is a client chat
+    # Client chats count their messages; the summary itself is refreshed in the background
     if chat_session and chat_session.client_name:
-        # Count total messages in this client chat
-        message_count = ChatMessage.query.filter_by(session_id=chat_id).count()
-        
-        # Get or create client summary
         client_summary = ClientSummary.query.filter_by(
             user_id=current_user.id,
             client_name=chat_session.client_name
         ).first()
-        
-        # Every 5 messages, update the summary
-        if message_count % 5 == 0:
-            # Get recent messages
-            messages = ChatMessage.query.filter_by(
-                session_id=chat_id
-            ).order_by(ChatMessage.timestamp.desc()).limit(10).all()
-            
-            # Generate summary
-            transcript = extract_transcript(messages)
-            summary = generate_summary(transcript)
-            
-            if client_summary:
-                client_summary.summary = summary
-                client_summary.last_updated = datetime.utcnow()
-            else:
-                client_summary = ClientSummary(
-                    user_id=current_user.id,
-                    client_name=chat_session.client_name,
-                    summary=summary
-                )
-                db.session.add(client_summary)
+        if client_summary is None:
+            client_summary = ClientSummary(
+                user_id=current_user.id,
+                client_name=chat_session.client_name,
+                summary='',
+                message_count=0
+            )
+            db.session.add(client_summary)
+            db.session.flush()
+        # SQL-side increment so concurrent requests and the summary worker don't lose counts
+        client_summary.message_count = ClientSummary.message_count + 2
 
     db.session.commit()
+
+    if chat_session and chat_session.client_name and client_summary.message_count >= SUMMARY_EVERY_N_MESSAGES:
+        schedule_client_summary(current_user.id, chat_session.client_name)
+
+def _sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route("/v1/chat/agent", methods=['POST'])
+@login_required
+def agent_chat():
+    data = request.json
+    chat_id = data['chat_id']
+    user_message = data['message']
+
+    # Get the chat session to check if it's a client chat
+    chat_session = ChatSession.query.get(chat_id)
+    agent, inputs = _select_chat_agent(chat_id, user_message, chat_session)
+
+    ai_response, cacheable = _general_fast_answer(agent, chat_id, user_message)
+    if ai_response is None:
+        result = agent.invoke(inputs, config={"configurable": {"thread_id": chat_id}})
+        ai_response = result['messages'][-1].content
+        if cacheable:
+            general_response_cache.store(user_message, ai_response)
+
+    _save_chat_exchange(chat_id, chat_session, user_message, ai_response)
     return jsonify(ai_response)
 
+@app.route("/v1/chat/agent/stream", methods=['POST'])
+@login_required
+def agent_chat_stream():
+    """Same as agent_chat, but pushes the supervisor's answer as Server-Sent Events.
+
+    Emits ``token`` events while the answer is generated, then a single ``done``
+    event carrying the full response. Messages are only persisted once the
+    stream completes; on failure an ``error`` event is sent and nothing is saved.
+    """
+    data = request.json
+    chat_id = data['chat_id']
+    user_message = data['message']
+
+    chat_session = ChatSession.query.get(chat_id)
+    agent, inputs = _select_chat_agent(chat_id, user_message, chat_session)
+
+    def generate():
+        final_state = None
+        streamed = []
+        try:
+            fast_response, cacheable = _general_fast_answer(agent, chat_id, user_message)
+            if fast_response is not None:
+                _save_chat_exchange(chat_id, chat_session, user_message, fast_response)
+                yield _sse_event("token", {"content": fast_response})
+                yield _sse_event("done", {"content": fast_response})
+                return
+
+            for mode, chunk in agent.stream(
+                inputs,
+                config={"configurable": {"thread_id": chat_id}},
+                stream_mode=["messages", "values"]
+            ):
+                if mode == "values":
+                    final_state = chunk
+                    continue
+                message, metadata = chunk
+                # Only the supervisor's own reply reaches the user (output_mode="last_message");
+                # tool-call chunks carry no content and are skipped as well.
+                if metadata.get("langgraph_node") != "supervisor":
+                    continue
+                content = message.content if isinstance(message.content, str) else ""
+                if content:
+                    streamed.append(content)
+                    yield _sse_event("token", {"content": content})
+
+            if final_state and final_state.get("messages"):
+                ai_response = final_state["messages"][-1].content
+            else:
+                ai_response = "".join(streamed)
+            if cacheable:
+                general_response_cache.store(user_message, ai_response)
+
+            _save_chat_exchange(chat_id, chat_session, user_message, ai_response)
+            yield _sse_event("done", {"content": ai_response})
+        except Exception as e:
+            db.session.rollback()
+            traceback.print_exc()
+            yield _sse_event("error", {"error": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 
 
 @app.route("/v1/chat/newchat",methods=['POST'])
@@ -674,7 +930,7 @@ def new_chat_id():
         agent = User.query.get(agent_id)
         if agent:
             # Get all client summaries for this agent
-            summaries = ClientSummary.query.filter_by(user_id=agent_id).all()
+            summaries = ClientSummary.query.filter(ClientSummary.user_id == agent_id, ClientSummary.summary != '').all()
             
             # Format the summary message
             message = f"In summary, Agent {agent.username} is working on {len(summaries)} active clients.\n\nHere are the updates:\n"
@@ -747,12 +1003,18 @@ def find_client_chat(client_name):
 @login_required
 def delete_client(client_name):
     # Delete all chat sessions for this client
+    chat_ids = [row[0] for row in db.session.query(ChatSession.id).filter_by(
+        user_id=current_user.id,
+        client_name=client_name
+    ).all()]
     deleted_count = ChatSession.query.filter_by(
         user_id=current_user.id,
         client_name=client_name
     ).delete()
     
     db.session.commit()
+    # Drop the agent memory for those chats as well
+    delete_checkpoint_threads(chat_ids)
     return jsonify({'success': True, 'deleted_chats': deleted_count})
 
 # Edit client name (updates all chats for that client)
@@ -775,14 +1037,72 @@ def rename_client(old_name):
     db.session.commit()
     return jsonify({'success': True, 'updated_chats': updated_count, 'new_name': new_name})
         
+# --- keyset pagination: ?limit=N&cursor=... ; the next page's cursor comes back in X-Next-Cursor ---
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))
+CHAT_MESSAGES_PAGE_SIZE = int(os.getenv("CHAT_MESSAGES_PAGE_SIZE", "30"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+def _encode_cursor(*values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor):
+    """[sort key text, id] from a cursor made by _encode_cursor; ValueError for anything else."""
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError('malformed cursor')
+    sort_key, row_id = values
+    # Anything else would reach SQLite as a bind parameter and fail there with a 500
+    if not isinstance(sort_key, str) or isinstance(row_id, bool) or not isinstance(row_id, (int, str)):
+        raise ValueError('malformed cursor')
+    return values
+
+def _page_args(default_size):
+    """(limit, cursor values or None) from the query string; ValueError on a bad cursor."""
+    limit = min(max(request.args.get('limit', default_size, type=int), 1), MAX_PAGE_SIZE)
+    cursor = request.args.get('cursor')
+    return limit, (_decode_cursor(cursor) if cursor else None)
+
+def _keyset_page(query, sort_column, id_column, limit, cursor):
+    """
+    One page of `query` ordered newest first by (sort_column, id_column), starting after
+    `cursor`. Returns (rows, next cursor or None).
+
+    The sort column is compared as the text SQLite stores, so rows written by SQL
+    defaults (no microseconds) and by SQLAlchemy (with them) page consistently.
+    """
+    sort_key = db.type_coerce(sort_column, db.String)
+    if cursor is not None:
+        query = query.filter(db.tuple_(sort_key, id_column) < db.tuple_(*cursor))
+    rows = query.add_columns(sort_key).order_by(sort_key.desc(), id_column.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last, last_key = rows[-1]
+        next_cursor = _encode_cursor(last_key, getattr(last, id_column.key))
+    return [row for row, _ in rows], next_cursor
+
+def _paged_response(items, next_cursor):
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
 @app.route("/v1/chat/sessions", methods=['GET'])
 @login_required
 def get_user_chats():
-    sessions = ChatSession.query.filter_by(user_id=current_user.id).order_by(ChatSession.created_at.desc()).all()
-    return jsonify([
+    try:
+        limit, cursor = _page_args(PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    sessions, next_cursor = _keyset_page(
+        ChatSession.query.filter_by(user_id=current_user.id),
+        ChatSession.created_at, ChatSession.id, limit, cursor
+    )
+    return _paged_response([
         {'id': s.id, 'title': s.title, 'created_at': s.created_at.isoformat()}
         for s in sessions
-    ])
+    ], next_cursor)
 
 @app.route('/v1/chat/loadchat/<chat_id>', methods=['GET'])
 @login_required
@@ -791,16 +1111,25 @@ def load_chat(chat_id):
     if not session:
         return jsonify({'error': 'Chat session not found'}), 404
 
-    messages = ChatMessage.query.filter_by(session_id=chat_id).order_by(ChatMessage.timestamp).all()
+    try:
+        limit, cursor = _page_args(CHAT_MESSAGES_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    # Newest page first; X-Next-Cursor fetches the messages before it
+    messages, next_cursor = _keyset_page(
+        ChatMessage.query.filter_by(session_id=chat_id),
+        ChatMessage.timestamp, ChatMessage.id, limit, cursor
+    )
     
-    return jsonify([
+    return _paged_response([
         {
             'content': m.message,
             'role': 'user' if m.sender == 'user' else 'bot',
             'timestamp': m.timestamp.isoformat()
         }
-        for m in messages
-    ])
+        for m in reversed(messages)  # oldest first within the page
+    ], next_cursor)
 
 @app.route('/v1/chat/renamechat', methods=['POST'])
 @login_required
@@ -840,6 +1169,7 @@ def delete_chat():
     # Delete the chat session
     db.session.delete(chat)
     db.session.commit()
+    delete_checkpoint_threads([chat_id])
     
     return jsonify({'success': True, 'message': 'Chat deleted successfully'})
 
@@ -868,7 +1198,8 @@ def get_chat_summary():
         transcript = extract_transcript(messages)
 
         # Generate summary using the LLM directly
-        summary = generate_summary(transcript)
+        with llm_priority(SUMMARY):
+            summary = generate_summary(transcript)
         
         return jsonify({'summary': summary, 'success': True})
         
@@ -876,6 +1207,271 @@ def get_chat_summary():
         print(f"Error generating summary: {e}")
         return jsonify({'error': 'Failed to generate summary'}), 500
 
+# --- client summaries: refreshed incrementally by a background worker, not in the request ---
+SUMMARY_EVERY_N_MESSAGES = int(os.getenv("SUMMARY_EVERY_N_MESSAGES", "5"))
+# Wait this long after the trigger so a burst of messages is folded in by one LLM call
+SUMMARY_DEBOUNCE_SECONDS = float(os.getenv("SUMMARY_DEBOUNCE_SECONDS", "10"))
+# Cap on the messages folded in per LLM call; a longer backlog (e.g. the first summary
+# of a long chat) is folded in oldest first over several calls
+SUMMARY_MAX_NEW_MESSAGES = int(os.getenv("SUMMARY_MAX_NEW_MESSAGES", "50"))
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "2"))
+_summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="client-summary")
+
+# (user_id, client_name) -> 'pending' (debouncing), 'running' or 'rerun' (triggered while running)
+_summary_jobs = {}
+_summary_jobs_lock = threading.Lock()
+
+def schedule_client_summary(user_id, client_name):
+    """Queue a summary refresh for a client; triggers while one is pending or running coalesce."""
+    key = (user_id, client_name)
+    with _summary_jobs_lock:
+        state = _summary_jobs.get(key)
+        if state == 'running':
+            _summary_jobs[key] = 'rerun'
+        if state is not None:
+            return
+        _summary_jobs[key] = 'pending'
+    timer = threading.Timer(SUMMARY_DEBOUNCE_SECONDS, _summary_executor.submit, args=(_run_client_summary, key))
+    timer.daemon = True
+    timer.start()
+
+def _run_client_summary(key):
+    while True:
+        with _summary_jobs_lock:
+            _summary_jobs[key] = 'running'
+        try:
+            refresh_client_summary(*key)
+        except Exception:
+            traceback.print_exc()
+        with _summary_jobs_lock:
+            if _summary_jobs.get(key) != 'rerun':
+                _summary_jobs.pop(key, None)
+                return
+
+def refresh_client_summary(user_id, client_name):
+    """Fold the client's messages since the last summary into ClientSummary.summary."""
+    with app.app_context():
+        client_summary = ClientSummary.query.filter_by(user_id=user_id, client_name=client_name).first()
+        if not client_summary:
+            return
+        folded_count = client_summary.message_count or 0
+
+        messages = ChatMessage.query.join(ChatSession, ChatMessage.session_id == ChatSession.id).filter(
+            ChatSession.user_id == user_id,
+            ChatSession.client_name == client_name
+        )
+        since = client_summary.last_updated if client_summary.summary else None
+        folded_any = False
+        while True:
+            query = messages if since is None else messages.filter(ChatMessage.timestamp > since)
+            batch = query.order_by(ChatMessage.timestamp, ChatMessage.id).limit(SUMMARY_MAX_NEW_MESSAGES).all()
+            if len(batch) == SUMMARY_MAX_NEW_MESSAGES and batch[0].timestamp != batch[-1].timestamp:
+                # Messages sharing the cut-off timestamp go into the next batch together,
+                # since the next query only asks for later ones
+                batch = [m for m in batch if m.timestamp != batch[-1].timestamp]
+            if not batch:
+                break
+            transcript = extract_transcript(batch)
+            # Background work: yields the API to live chat when the model is at its limit
+            with llm_priority(SUMMARY):
+                if client_summary.summary:
+                    client_summary.summary = update_summary(client_summary.summary, transcript)
+                else:
+                    client_summary.summary = generate_summary(transcript)
+            # The newest folded message, not "now": anything saved meanwhile is picked up next
+            since = client_summary.last_updated = batch[-1].timestamp
+            # Each batch is kept even if a later one fails
+            db.session.commit()
+            folded_any = True
+        # Messages saved while the LLM was running stay counted
+        client_summary.message_count = ClientSummary.message_count - folded_count
+        db.session.commit()
+        if folded_any:
+            invalidate_home_sidebar()
+
+# --- transcription jobs: the request only enqueues, a worker pool runs the pipeline ---
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "2"))
+_transcribe_executor = ThreadPoolExecutor(max_workers=TRANSCRIBE_WORKERS, thread_name_prefix="transcribe")
+
+def _update_job(job, **fields):
+    for key, value in fields.items():
+        setattr(job, key, value)
+    job.updated_at = datetime.utcnow()
+    db.session.commit()
+
+def _job_payload(job):
+    return {
+        "job_id": job.id,
+        "title": job.title,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress or 0,
+        "error": job.error,
+        "transcript_id": job.transcript_id,
+        "file_url": url_for('download_transcript', transcript_id=job.transcript_id) if job.transcript_id else None,
+        # A failed job keeps its audio so it can be run again
+        "retryable": job.status == 'failed' and os.path.exists(job.audio_path),
+        "created_at": job.created_at.isoformat() if job.created_at else None
+    }
+
+def enqueue_transcription_job(job_id):
+    _transcribe_executor.submit(_run_transcription_job, job_id)
+
+def _run_transcription_job(job_id):
+    """Run the whole transcription pipeline for one job, recording stage and progress as it goes."""
+    with app.app_context():
+        job = db.session.get(TranscriptionJob, job_id)
+        if not job or job.status not in ('queued', 'running'):
+            return
+
+        tmp_path = job.audio_path
+        title = job.title
+        try:
+            # Choose model & response format
+            model_name = os.getenv("STT_MODEL", "whisper-1")
+            use_verbose = ("whisper" in model_name)
+            resp_format = "verbose_json" if use_verbose else "json"
+
+            # OpenAI call
+            _update_job(job, status='running', stage='transcribing', progress=10, error=None)
+            with open(tmp_path, "rb") as f, llm_priority(TRANSCRIPTION):
+                resp = client.audio.transcriptions.create(
+                    model=model_name,
+                    file=f,
+                    response_format=resp_format
+                )
+
+            # Parse via dict
+            rd = resp.model_dump() if hasattr(resp, "model_dump") else {}
+            segments = []
+            if use_verbose and isinstance(rd.get("segments"), list):
+                for s in rd["segments"]:
+                    segments.append({
+                        "start": float(s.get("start") or 0.0),
+                        "end": float(s.get("end") or 0.0),
+                        "text": (s.get("text") or "").strip()
+                    })
+            else:
+                text = (rd.get("text") or "").strip()
+                segments = [{"start": 0.0, "end": 0.0, "text": text}]
+
+            # Diarization only if timestamps exist
+            _update_job(job, stage='diarizing', progress=50)
+            if use_verbose:
+                diar_segments = diarize_file(tmp_path)  # returns None if disabled
+                labeled = assign_speakers(segments, diar_segments)
+            else:
+                labeled = [{"speaker": "Speaker 1", **s} for s in segments]
+
+            # Normalize speakers
+            speaker_map, next_idx = {}, 1
+            for it in labeled:
+                key = it["speaker"]
+                if key not in speaker_map:
+                    speaker_map[key] = f"Speaker {next_idx}"
+                    next_idx += 1
+                it["speaker"] = speaker_map[key]
+            num_speakers = max(1, len(speaker_map))
+
+            # Pretty text
+            def hhmmss(t):
+                t = max(0.0, float(t or 0.0))
+                h = int(t // 3600); m = int((t % 3600) // 60); s = int(t % 60)
+                return f"{h:02d}:{m:02d}:{s:02d}"
+
+            lines = [f"[{hhmmss(seg['start'])}–{hhmmss(seg['end'])}] {seg['speaker']}: {seg['text']}"
+                     for seg in labeled]
+            pretty_text = "\n".join(lines).strip()
+
+            # Save PDF
+            _update_job(job, stage='rendering', progress=80)
+            base_dir = Path("uploads") / "transcripts" / str(job.user_id)
+            base_dir.mkdir(parents=True, exist_ok=True)
+            stamp = int(time.time())
+            safe_title = "".join(c for c in title if c.isalnum() or c in (" ", "_", "-")).rstrip() or "meeting"
+            pdf_path = base_dir / f"{stamp}_{safe_title}.pdf"
+
+            write_transcript_pdf(
+                str(pdf_path),
+                title=title,
+                pretty_text=pretty_text,
+                meta={"Model": model_name, "Speakers": str(num_speakers)}
+            )
+
+            # DB row (store preview text & file path)
+            transcript = Transcript(
+                user_id=job.user_id,
+                chat_id=None,
+                title=title,
+                text=pretty_text  # used for sidebar preview
+            )
+            try:
+                transcript.file_path = str(pdf_path)
+                transcript.speakers_count = num_speakers
+                transcript.language = rd.get("language")
+            except Exception:
+                pass
+
+            db.session.add(transcript)
+            db.session.flush()
+            _update_job(job, status='completed', stage='done', progress=100, transcript_id=transcript.id)
+
+        except Exception as e:
+            traceback.print_exc()
+            db.session.rollback()
+            # The uploaded audio stays until the job is retried successfully or dismissed
+            _update_job(job, status='failed', error=str(e))
+            return
+
+        # Cleanup uploaded audio
+        try: os.remove(tmp_path)
+        except Exception: pass
+
+def resume_transcription_jobs():
+    """Re-enqueue jobs left unfinished by a previous process."""
+    pending = TranscriptionJob.query.filter(TranscriptionJob.status.in_(['queued', 'running'])).all()
+    for job in pending:
+        # Claim the job first, so of several worker processes starting together only one
+        # re-queues it: the others no longer find the updated_at they read
+        claimed = TranscriptionJob.query.filter_by(id=job.id, updated_at=job.updated_at)\
+            .update({'updated_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            continue
+        db.session.refresh(job)
+        if os.path.exists(job.audio_path):
+            _update_job(job, status='queued', stage=None, progress=0)
+            enqueue_transcription_job(job.id)
+        else:
+            _update_job(job, status='failed', error='Audio file missing after restart')
+
+_startup_lock = threading.Lock()
+_startup_done = False
+
+def run_startup_tasks():
+    """
+    Once per serving process: apply schema migrations, pick unfinished transcription jobs
+    back up and start checkpoint maintenance. Runs before the first request, so every
+    entry point (python app.py, flask run, a WSGI server) gets it, while CLI commands and
+    the reloader's watcher process, which serve no requests, don't.
+    """
+    global _startup_done
+    with _startup_lock:
+        if _startup_done:
+            return
+        db.create_all()
+        # Schema changes for existing databases (columns, indexes); idempotent
+        run_migrations()
+        resume_transcription_jobs()
+        start_checkpoint_maintenance()
+        # Only once everything succeeded: after an error the next request tries again
+        _startup_done = True
+
+@app.before_request
+def _run_startup_tasks_once():
+    if not _startup_done:
+        run_startup_tasks()
+
 @app.route('/api/transcribe', methods=['POST'])
 @login_required
 def transcribe_audio():
@@ -888,127 +1484,103 @@ def transcribe_audio():
         audio_file = request.files['audio']
         filename = secure_filename(audio_file.filename or 'meeting.webm')
 
-        # Save to temp
+        # Save to temp; the worker removes it when the job finishes
         with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
             tmp_path = tmp.name
             audio_file.save(tmp_path)
 
-        # Choose model & response format
-        model_name = os.getenv("STT_MODEL", "whisper-1")
-        use_verbose = ("whisper" in model_name)
-        resp_format = "verbose_json" if use_verbose else "json"
-
-        # OpenAI call
-        with open(tmp_path, "rb") as f:
-            resp = client.audio.transcriptions.create(
-                model=model_name,
-                file=f,
-                response_format=resp_format
-            )
-
-        # Parse via dict
-        rd = resp.model_dump() if hasattr(resp, "model_dump") else {}
-        segments = []
-        if use_verbose and isinstance(rd.get("segments"), list):
-            for s in rd["segments"]:
-                segments.append({
-                    "start": float(s.get("start") or 0.0),
-                    "end": float(s.get("end") or 0.0),
-                    "text": (s.get("text") or "").strip()
-                })
-        else:
-            text = (rd.get("text") or "").strip()
-            segments = [{"start": 0.0, "end": 0.0, "text": text}]
-
-        # Diarization only if timestamps exist
-        if use_verbose:
-            diar_segments = diarize_file(tmp_path)  # returns None if disabled
-            labeled = assign_speakers(segments, diar_segments)
-        else:
-            labeled = [{"speaker": "Speaker 1", **s} for s in segments]
-
-        # Normalize speakers
-        speaker_map, next_idx = {}, 1
-        for it in labeled:
-            key = it["speaker"]
-            if key not in speaker_map:
-                speaker_map[key] = f"Speaker {next_idx}"
-                next_idx += 1
-            it["speaker"] = speaker_map[key]
-        num_speakers = max(1, len(speaker_map))
-
-        # Pretty text
-        def hhmmss(t):
-            t = max(0.0, float(t or 0.0))
-            h = int(t // 3600); m = int((t % 3600) // 60); s = int(t % 60)
-            return f"{h:02d}:{m:02d}:{s:02d}"
-
-        lines = [f"[{hhmmss(seg['start'])}–{hhmmss(seg['end'])}] {seg['speaker']}: {seg['text']}"
-                 for seg in labeled]
-        pretty_text = "\n".join(lines).strip()
-
-        # Save PDF
-        base_dir = Path("uploads") / "transcripts" / str(current_user.id)
-        base_dir.mkdir(parents=True, exist_ok=True)
-        stamp = int(time.time())
-        safe_title = "".join(c for c in title if c.isalnum() or c in (" ", "_", "-")).rstrip() or "meeting"
-        pdf_path = base_dir / f"{stamp}_{safe_title}.pdf"
-
-        write_transcript_pdf(
-            str(pdf_path),
-            title=title,
-            pretty_text=pretty_text,
-            meta={"Model": model_name, "Speakers": str(num_speakers)}
-        )
-
-        # DB row (store preview text & file path)
-        transcript = Transcript(
+        job = TranscriptionJob(
             user_id=current_user.id,
-            chat_id=None,
             title=title,
-            text=pretty_text  # used for sidebar preview
+            audio_path=tmp_path
         )
-        try:
-            transcript.file_path = str(pdf_path)
-            transcript.speakers_count = num_speakers
-            transcript.language = rd.get("language")
-        except Exception:
-            pass
-
-        db.session.add(transcript)
+        db.session.add(job)
         db.session.commit()
-
-        # Cleanup temp
-        try: os.remove(tmp_path)
-        except Exception: pass
+        enqueue_transcription_job(job.id)
 
         return jsonify({
             "success": True,
-            "transcript_id": transcript.id,
-            "title": title,
-            "file_url": url_for('download_transcript', transcript_id=transcript.id),
-            "speakers": num_speakers
-        })
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": url_for('get_transcription_job', job_id=job.id)
+        }), 202
 
     except Exception as e:
         import traceback; traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-    
+@app.route('/v1/transcripts/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_transcription_job(job_id):
+    job = TranscriptionJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if not job:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(_job_payload(job))
+
+@app.route('/v1/transcripts/jobs/<job_id>/retry', methods=['POST'])
+@login_required
+def retry_transcription_job(job_id):
+    job = TranscriptionJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if not job:
+        return jsonify({"error": "Not found"}), 404
+    if job.status != 'failed':
+        return jsonify({"error": "Only failed jobs can be retried"}), 409
+    if not os.path.exists(job.audio_path):
+        return jsonify({"error": "The recording is no longer available"}), 410
+    _update_job(job, status='queued', stage=None, progress=0, error=None)
+    enqueue_transcription_job(job.id)
+    return jsonify(_job_payload(job)), 202
+
+@app.route('/v1/transcripts/jobs/<job_id>', methods=['DELETE'])
+@login_required
+def dismiss_transcription_job(job_id):
+    """Drop a failed job and its recording."""
+    job = TranscriptionJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if not job:
+        return jsonify({"error": "Not found"}), 404
+    if job.status in ('queued', 'running'):
+        return jsonify({"error": "Job is still running"}), 409
+    try:
+        if os.path.exists(job.audio_path):
+            os.remove(job.audio_path)
+    except Exception as e:
+        print("audio delete warning:", e)
+    db.session.delete(job)
+    db.session.commit()
+    return jsonify({"success": True})
+
 @app.route('/v1/transcripts', methods=['GET'])
 @login_required
 def list_transcripts():
-    rows = Transcript.query.filter_by(user_id=current_user.id).order_by(Transcript.created_at.desc()).all()
+    try:
+        limit, cursor = _page_args(PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+
     out = []
+    if cursor is None:
+        # Jobs still in the pipeline (or failed, to retry or dismiss) are listed first so
+        # the sidebar can show their progress
+        jobs = TranscriptionJob.query.filter(
+            TranscriptionJob.user_id == current_user.id,
+            TranscriptionJob.status.in_(['queued', 'running', 'failed'])
+        ).order_by(TranscriptionJob.created_at.desc()).all()
+        out = [_job_payload(job) for job in jobs]
+
+    rows, next_cursor = _keyset_page(
+        Transcript.query.filter_by(user_id=current_user.id),
+        Transcript.created_at, Transcript.id, limit, cursor
+    )
     for t in rows:
         out.append({
             "id": t.id,
             "title": t.title,
+            "status": "completed",
             "created_at": t.created_at.isoformat(),
             "preview": (t.text[:200] + '...') if len(t.text) > 200 else t.text,
             "file_url": url_for('download_transcript', transcript_id=t.id)
         })
-    return jsonify(out)
+    return _paged_response(out, next_cursor)
 
 @app.route('/v1/transcripts/<int:transcript_id>/download', methods=['GET'])
 @login_required
@@ -1034,6 +1606,31 @@ def delete_transcript(transcript_id):
     db.session.commit()
     return jsonify({"success": True})
 
+@app.route('/v1/packages/compare', methods=['GET'])
+@login_required
+def compare_package_benefits():
+    """Side-by-side benefits, e.g. ?packages=silver,gold&benefits=dental,maternity (all benefits if omitted)."""
+    package_names = [p for p in request.args.get('packages', '').split(',') if p.strip()]
+    benefit_names = [b for b in request.args.get('benefits', '').split(',') if b.strip()]
+
+    levels = [resolve_package(p) for p in package_names]
+    if not package_names or None in levels:
+        return jsonify({"error": "Unknown or missing package", "available": PACKAGE_LEVELS}), 400
+    benefits = [resolve_benefit(b) for b in benefit_names]
+    if None in benefits:
+        unknown = [name for name, benefit in zip(benefit_names, benefits) if benefit is None]
+        return jsonify({"error": f"Unknown benefit(s): {', '.join(unknown)}"}), 400
+
+    return jsonify(compare_packages(list(dict.fromkeys(levels)), list(dict.fromkeys(benefits))))
+
+@app.route('/v1/packages/<package>', methods=['GET'])
+@login_required
+def get_package_details(package):
+    level = resolve_package(package)
+    if not level:
+        return jsonify({"error": f"Unknown package '{package}'", "available": PACKAGE_LEVELS}), 404
+    return jsonify(get_package(level))
+
 @app.route('/v1/chat/report', methods=['POST'])
 @login_required
 def generate_chat_report():
@@ -1590,378 +2187,174 @@ def generate_chat_report():
     )
 
 # SME Leader Dashboard API Routes
-@app.route('/api/sme/gwp-growth-trend', methods=['GET'])
-@role_required('smeleader')
-def get_gwp_growth_trend():
-    """Get GWP Growth Trend data from Excel file for D3.js chart"""
+def _sme_chart_response(name, label):
     try:
-        # Read the kpi_monthly sheet from sme.xlsx
-        df = pd.read_excel('sme.xlsx', sheet_name='kpi_monthly')
-        
-        # Extract the Month and GWP Monthly columns
-        data = []
-        for index, row in df.iterrows():
-            if pd.notna(row['Month']) and pd.notna(row['1.2a GWP Monthly M SAR']):
-                month_str = str(row['Month']).strip()
-                
-                data.append({
-                    'month': month_str,  # Keep full format like "Jul 2024"
-                    'gwp_value': float(row['1.2a GWP Monthly M SAR'])
-                })
-        
-        return jsonify(data)
+        payload, status = get_sme_chart(name)
+        return jsonify(payload), status
         
     except FileNotFoundError as e:
         print(f"File not found error: {e}")
         return jsonify({'error': 'SME Excel file not found'}), 404
     except Exception as e:
-        print(f"Error in get_gwp_growth_trend: {e}")
+        print(f"Error in {request.endpoint}: {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({'error': f'Failed to load GWP data: {str(e)}'}), 500
+        return jsonify({'error': f'Failed to load {label} data: {str(e)}'}), 500
+
+@app.route('/api/sme/gwp-growth-trend', methods=['GET'])
+@role_required('smeleader')
+def get_gwp_growth_trend():
+    """Get GWP Growth Trend data from Excel file for D3.js chart"""
+    return _sme_chart_response('gwp-growth-trend', 'GWP')
 
 @app.route('/api/sme/funnel-size-trend', methods=['GET'])
 @role_required('smeleader')
 def get_funnel_size_trend():
     """Get Funnel Size Trend data from Excel file for D3.js line chart"""
-    try:
-        # Read the kpi_monthly sheet from sme.xlsx
-        df = pd.read_excel('sme.xlsx', sheet_name='kpi_monthly')
-        
-        # Extract the Month and Funnel Size Count columns
-        data = []
-        for index, row in df.iterrows():
-            if pd.notna(row['Month']) and pd.notna(row['3.1 Funnel Size Count']):
-                month_str = str(row['Month']).strip()
-                
-                data.append({
-                    'month': month_str,  # Keep full format like "Jul 2024"
-                    'funnel_count': float(row['3.1 Funnel Size Count'])
-                })
-        
-        return jsonify(data)
-        
-    except FileNotFoundError as e:
-        print(f"File not found error: {e}")
-        return jsonify({'error': 'SME Excel file not found'}), 404
-    except Exception as e:
-        print(f"Error in get_funnel_size_trend: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'Failed to load Funnel Size data: {str(e)}'}), 500
+    return _sme_chart_response('funnel-size-trend', 'Funnel Size')
 
 @app.route('/api/sme/funnel-coverage', methods=['GET'])
 @role_required('smeleader')
 def get_funnel_coverage():
     """Get Funnel Coverage data from Excel file - monthly coverage percentages"""
-    try:
-        # Read the kpi_monthly sheet from sme.xlsx
-        df = pd.read_excel('sme.xlsx', sheet_name='kpi_monthly')
-        
-        # Extract the Month and Funnel Coverage Pct columns
-        data = []
-        for index, row in df.iterrows():
-            if pd.notna(row['Month']) and pd.notna(row['3.2 Funnel Coverage Pct']):
-                month_str = str(row['Month']).strip()
-                
-                data.append({
-                    'month': month_str,  # Keep full format like "Jul 2024"
-                    'coverage_pct': float(row['3.2 Funnel Coverage Pct'])
-                })
-        
-        return jsonify(data)
-        
-    except FileNotFoundError as e:
-        print(f"File not found error: {e}")
-        return jsonify({'error': 'SME Excel file not found'}), 404
-    except Exception as e:
-        print(f"Error in get_funnel_coverage: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'Failed to load Funnel Coverage data: {str(e)}'}), 500
+    return _sme_chart_response('funnel-coverage', 'Funnel Coverage')
 
 @app.route('/api/sme/budget-fit-analysis', methods=['GET'])
 @role_required('smeleader')
 def get_budget_fit_analysis():
     """Get Budget Fit Analysis data from Excel file - averaged values across all months"""
-    try:
-        # Read the suhail_signals sheet from sme.xlsx
-        df = pd.read_excel('sme.xlsx', sheet_name='suhail_signals')
-        
-        # Check if required columns exist
-        required_columns = ['3.4.1_Budget_Fit_Pct', '3.4.2_Proposal_Diversity_Pct', '3.4.3_Competitor_WinRate_Pct']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            print(f"Missing columns in suhail_signals sheet: {missing_columns}")
-            print(f"Available columns: {list(df.columns)}")
-            return jsonify([])
-        
-        # Calculate averages across all months for each metric
-        budget_fit_avg = df['3.4.1_Budget_Fit_Pct'].dropna().mean()
-        proposal_diversity_avg = df['3.4.2_Proposal_Diversity_Pct'].dropna().mean()
-        competitor_winrate_avg = df['3.4.3_Competitor_WinRate_Pct'].dropna().mean()
-        
-        # Create the response data
-        result = [
-            {
-                'metric': 'Budget Fit Analysis',
-                'percentage': round(budget_fit_avg, 1) if not pd.isna(budget_fit_avg) else 0
-            },
-            {
-                'metric': 'Proposal Diversity',
-                'percentage': round(proposal_diversity_avg, 1) if not pd.isna(proposal_diversity_avg) else 0
-            },
-            {
-                'metric': 'Competitor Win/Loss',
-                'percentage': round(competitor_winrate_avg, 1) if not pd.isna(competitor_winrate_avg) else 0
-            }
-        ]
-        
-        print(f"Returning budget fit analysis data: {result}")
-        return jsonify(result)
-        
-    except FileNotFoundError as e:
-        print(f"File not found error: {e}")
-        return jsonify({'error': 'SME Excel file not found'}), 404
-    except Exception as e:
-        print(f"Error in get_budget_fit_analysis: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'Failed to load Budget Fit Analysis data: {str(e)}'}), 500
+    return _sme_chart_response('budget-fit-analysis', 'Budget Fit Analysis')
 
 @app.route('/api/sme/renewals-performance', methods=['GET'])
 @role_required('smeleader')
 def get_renewals_performance():
     """Get Renewals Performance data from Excel file - pie chart data"""
-    try:
-        # Read the targets_monthly sheet from sme.xlsx
-        df = pd.read_excel('sme.xlsx', sheet_name='targets_monthly')
-        
-        # Check if required columns exist
-        if 'Month' not in df.columns or 'Renewals_Performance_Pct' not in df.columns:
-            print(f"Available columns in targets_monthly sheet: {list(df.columns)}")
-            return jsonify({'error': 'Required columns not found'}), 404
-        
-        # Get the first non-null performance percentage (since it's consistent across months)
-        performance_pct = None
-        for index, row in df.iterrows():
-            if pd.notna(row['Renewals_Performance_Pct']):
-                performance_pct = float(row['Renewals_Performance_Pct'])
-                break
-        
-        if performance_pct is None:
-            return jsonify({'error': 'No valid performance data found'}), 404
-        
-        # Create pie chart data - performance vs remaining
-        remaining_pct = 100 - performance_pct
-        
-        result = {
-            'performance_pct': round(performance_pct, 1),
-            'remaining_pct': round(remaining_pct, 1),
-            'data': [
-                {
-                    'label': 'Achieved',
-                    'value': round(performance_pct, 1),
-                    'color': '#10b981'  # emerald-500
-                },
-                {
-                    'label': 'Remaining',
-                    'value': round(remaining_pct, 1),
-                    'color': '#6b7280'  # gray-500
-                }
-            ]
-        }
-        
-        print(f"Returning renewals performance data: {result}")
-        return jsonify(result)
-        
-    except FileNotFoundError as e:
-        print(f"File not found error: {e}")
-        return jsonify({'error': 'SME Excel file not found'}), 404
-    except Exception as e:
-        print(f"Error in get_renewals_performance: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'Failed to load Renewals Performance data: {str(e)}'}), 500
+    return _sme_chart_response('renewals-performance', 'Renewals Performance')
 
 @app.route('/api/sme/new-business-performance', methods=['GET'])
 @role_required('smeleader')
 def get_new_business_performance():
     """Get New Business Performance data from Excel file - pie chart data"""
-    try:
-        # Read the targets_monthly sheet from sme.xlsx
-        df = pd.read_excel('sme.xlsx', sheet_name='targets_monthly')
-        
-        # Check if required columns exist
-        if 'Month' not in df.columns or 'NB_Performance_Pct' not in df.columns:
-            print(f"Available columns in targets_monthly sheet: {list(df.columns)}")
-            return jsonify({'error': 'Required columns not found'}), 404
-        
-        # Get the first non-null performance percentage (since it's consistent across months)
-        performance_pct = None
-        for index, row in df.iterrows():
-            if pd.notna(row['NB_Performance_Pct']):
-                performance_pct = float(row['NB_Performance_Pct'])
-                break
-        
-        if performance_pct is None:
-            return jsonify({'error': 'No valid performance data found'}), 404
-        
-        # Create pie chart data - performance vs remaining
-        remaining_pct = 100 - performance_pct
-        
-        result = {
-            'performance_pct': round(performance_pct, 1),
-            'remaining_pct': round(remaining_pct, 1),
-            'data': [
-                {
-                    'label': 'Achieved',
-                    'value': round(performance_pct, 1),
-                    'color': '#8b5cf6'  # violet-500 (different color from renewals)
-                },
-                {
-                    'label': 'Gap To Target',
-                    'value': round(remaining_pct, 1),
-                    'color': '#6b7280'  # gray-500
-                }
-            ]
-        }
-        
-        print(f"Returning new business performance data: {result}")
-        return jsonify(result)
-        
-    except FileNotFoundError as e:
-        print(f"File not found error: {e}")
-        return jsonify({'error': 'SME Excel file not found'}), 404
-    except Exception as e:
-        print(f"Error in get_new_business_performance: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'Failed to load New Business Performance data: {str(e)}'}), 500
+    return _sme_chart_response('new-business-performance', 'New Business Performance')
 
 @app.route('/api/sme/overall-renewal-probability', methods=['GET'])
 @role_required('smeleader')
 def get_overall_renewal_probability():
     """Get Overall Renewal Probability data from Excel file - line chart data"""
-    try:
-        # Read the kpi_monthly sheet from sme.xlsx
-        df = pd.read_excel('sme.xlsx', sheet_name='kpi_monthly')
-        
-        # Check if required columns exist
-        if 'Month' not in df.columns or '2.3 Overall Renewal Probability Pct' not in df.columns:
-            print(f"Available columns in kpi_monthly sheet: {list(df.columns)}")
-            return jsonify({'error': 'Required columns not found'}), 404
-        
-        # Process the data
-        data = []
-        for index, row in df.iterrows():
-            if pd.notna(row['Month']) and pd.notna(row['2.3 Overall Renewal Probability Pct']):
-                data.append({
-                    'month': str(row['Month']).strip(),
-                    'probability_pct': float(row['2.3 Overall Renewal Probability Pct'])
-                })
-        
-        print(f"Returning overall renewal probability data: {data}")
-        return jsonify(data)
-        
-    except FileNotFoundError as e:
-        print(f"File not found error: {e}")
-        return jsonify({'error': 'SME Excel file not found'}), 404
-    except Exception as e:
-        print(f"Error in get_overall_renewal_probability: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'Failed to load Overall Renewal Probability data: {str(e)}'}), 500
+    return _sme_chart_response('overall-renewal-probability', 'Overall Renewal Probability')
 
 @app.route('/api/sme/competitor-overview', methods=['GET'])
 @role_required('smeleader')
 def get_competitor_overview():
     """Get Competitor Overview data from Excel file - average win rates by competitor"""
-    try:
-        # Read the competitor_outcomes sheet from sme.xlsx
-        df = pd.read_excel('sme.xlsx', sheet_name='competitor_outcomes')
-        
-        # Check if required columns exist
-        required_columns = ['Month', 'Competitor', 'Win_Rate_Pct']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            print(f"Missing columns in competitor_outcomes sheet: {missing_columns}")
-            print(f"Available columns: {list(df.columns)}")
-            return jsonify({'error': f'Required columns not found: {missing_columns}'}), 404
-        
-        # Group by Competitor and calculate average win rate
-        competitor_averages = df.groupby('Competitor')['Win_Rate_Pct'].mean().round(1)
-        
-        # Convert to list of dictionaries for the chart
-        data = []
-        for competitor, avg_win_rate in competitor_averages.items():
-            if pd.notna(avg_win_rate):  # Only include non-null values
-                if competitor != 'Tawuniya':
-                    # Exclude Tawuniya as per requirements
-                    data.append({
-                        'competitor': str(competitor).strip(),
-                        'avg_win_rate': float(avg_win_rate)
-                    })
-        
-        # Sort by win rate descending for better visualization
-        data.sort(key=lambda x: x['avg_win_rate'], reverse=True)
-        
-        print(f"Available columns in competitor_outcomes: {list(df.columns)}")
-        print(f"Returning competitor overview averages: {data}")
-        return jsonify(data)
-        
-    except FileNotFoundError as e:
-        print(f"File not found error: {e}")
-        return jsonify({'error': 'SME Excel file not found'}), 404
-    except Exception as e:
-        print(f"Error in get_competitor_overview: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'Failed to load Competitor Overview data: {str(e)}'}), 500
+    return _sme_chart_response('competitor-overview', 'Competitor Overview')
 
 @app.route('/api/sme/renewal-heatmap', methods=['GET'])
 @role_required('smeleader')
 def get_renewal_heatmap():
     """Get Renewal Heat Map data from Excel file for D3.js heatmap visualization"""
+    return _sme_chart_response('renewal-heatmap', 'heatmap')
+
+@app.route('/api/sme/dashboard', methods=['GET'])
+@role_required('smeleader')
+def get_sme_dashboard():
+    """
+    All SME dashboard chart series in one document, computed from a single workbook load.
+
+    ?charts=gwp-growth-trend,renewal-heatmap limits the response to a subset. A chart that
+    fails to build is reported under 'errors' and the others are still returned; only a
+    missing or unreadable workbook fails the request. The ETag tracks the workbook
+    version, so an unchanged file answers If-None-Match with a 304.
+    """
+    requested = request.args.get('charts')
+    if requested:
+        names = [n.strip() for n in requested.split(',') if n.strip()]
+        unknown = [n for n in names if n not in SME_CHARTS]
+        if unknown:
+            return jsonify({'error': f'Unknown charts: {unknown}', 'available': list(SME_CHARTS)}), 400
+    else:
+        names = list(SME_CHARTS)
+
     try:
-        # Read the heatmap_monthly sheet from sme.xlsx
-        df = pd.read_excel('sme.xlsx', sheet_name='heatmap_monthly')
-        
-        # Process the data for heatmap
-        data = []
-        for index, row in df.iterrows():
-            if pd.notna(row['Month']) and pd.notna(row['Bucket_Days']) and pd.notna(row['2.2_Renewal_Value_M_SAR']):
-                data.append({
-                    'month': str(row['Month']).strip(),
-                    'bucket_days': int(row['Bucket_Days']),
-                    'renewal_value': float(row['2.2_Renewal_Value_M_SAR'])
-                })
-        
-        return jsonify(data)
-        
+        signature, results = get_sme_charts(names)
     except FileNotFoundError as e:
         print(f"File not found error: {e}")
         return jsonify({'error': 'SME Excel file not found'}), 404
     except Exception as e:
-        print(f"Error in get_renewal_heatmap: {e}")
+        print(f"Error in get_sme_dashboard: {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({'error': f'Failed to load heatmap data: {str(e)}'}), 500
+        return jsonify({'error': f'Failed to load dashboard data: {str(e)}'}), 500
+
+    errors = {name: payload.get('error') for name, (payload, status) in results.items() if status != 200}
+    etag = hashlib.md5(f"{signature}:{','.join(names)}".encode()).hexdigest()
+    if not errors and request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify({
+            'charts': {name: payload for name, (payload, status) in results.items() if status == 200},
+            'errors': errors
+        })
+    # Failed charts are retried on the next request, so only a complete document gets an ETag
+    if not errors:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.cli.command('migrate')
+@click.option('--check-plans', is_flag=True, help='Print EXPLAIN QUERY PLAN for the hot queries.')
+def migrate_command(check_plans):
+    """Create missing tables and apply pending schema migrations."""
+    db.create_all()
+    applied = run_migrations()
+    print(f"Applied {len(applied)} migration(s)" if applied else "Database schema is up to date")
+    if check_plans:
+        for name, index_name, plan, uses_index in check_query_plans():
+            print(f"[{'ok' if uses_index else 'MISSING'}] {name}: {plan}")
+
+@app.cli.command('compact-checkpoints')
+@click.option('--keep', default=CHECKPOINT_KEEP_LAST, show_default=True, help='Checkpoints to keep per chat thread.')
+@click.option('--full', is_flag=True, help='Run a full VACUUM instead of an incremental one.')
+def compact_checkpoints_command(keep, full):
+    """Prune old LangGraph checkpoints and compact the checkpoint database."""
+    checkpoints_deleted, writes_deleted, reclaimed = run_checkpoint_maintenance(keep_last=keep, full=full)
+    print(f"Pruned {checkpoints_deleted} checkpoints and {writes_deleted} writes")
+    print(f"Reclaimed {reclaimed:,} bytes")
+
+@app.cli.command('recompress-checkpoints')
+@click.option('--train-dict', 'dict_path', default=None, help='Train a zstd dictionary on the stored checkpoints, save it here and compress with it.')
+@click.option('--level', default=3, show_default=True, help='zstd compression level.')
+@click.confirmation_option(prompt='Checkpoints are rewritten in place. Is the app stopped?')
+def recompress_checkpoints_command(dict_path, level):
+    """
+    Rewrite stored LangGraph checkpoints zstd-compressed (SQLite backend).
+
+    Run it with the app stopped: a running app keeps writing rows with its own settings
+    and dictionary. Rows are tagged with the id of the dictionary they were compressed
+    with, so an app started with another CHECKPOINT_ZSTD_DICT_PATH refuses to load them
+    instead of decoding garbage.
+    """
+    saver = get_checkpointer()
+    dict_data = None
+    if dict_path:
+        samples = train_checkpoint_dictionary(saver, dict_path)
+        print(f"Trained dictionary on {samples} blobs -> {dict_path}")
+        with open(dict_path, 'rb') as f:
+            dict_data = f.read()
+    serde = ZstdCheckpointSerializer(level=level, dict_data=dict_data)
+    stats = recompress_checkpoints(saver, serde)
+    rows = stats['rows'] or 1
+    print(f"Recompressed {stats['rows']} blobs: {stats['bytes_before']:,} -> {stats['bytes_after']:,} bytes"
+          + (f" with dictionary {serde.dict_id}" if serde.dict_id else ""))
+    print(f"Avg load: {stats['load_seconds_before'] / rows * 1e6:.1f} us -> "
+          f"{stats['load_seconds_after'] / rows * 1e6:.1f} us")
+    print("Set CHECKPOINT_COMPRESSION=zstd" + (f" and CHECKPOINT_ZSTD_DICT_PATH={dict_path}" if dict_path else "")
+          + " before restarting so the app can read them.")
 
 if __name__ == '__main__':
-    with app.app_context():
-        # Check if we need to add manager_id column
-        
-        inspector = db.inspect(db.engine)
-        existing_columns = [column['name'] for column in inspector.get_columns('user')]
-        
-        if 'manager_id' not in existing_columns:
-            # Add the manager_id column to existing database
-            with db.engine.connect() as conn:
-                conn.execute(db.text("ALTER TABLE user ADD COLUMN manager_id INTEGER"))
-                conn.commit()
-                print("Added manager_id column to user table")
-        db.create_all()
+    # With the debug reloader only the serving child process should pick jobs back up;
+    # otherwise the first request runs the start-up tasks
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        with app.app_context():
+            run_startup_tasks()
     app.run(host='0.0.0.0', port=5002, debug=True)
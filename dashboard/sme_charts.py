@@ -0,0 +1,254 @@
+import threading
+import traceback
+
+import pandas as pd
+
+from dashboard.sme_workbook import load_sme_workbook
+
+# Each builder turns the parsed SME workbook into one chart's JSON payload and returns
+# (payload, status_code), so the per-chart routes and the batched dashboard route share
+# the same logic.
+
+
+def _sheet(sheets, sheet_name):
+    if sheet_name not in sheets:
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+    return sheets[sheet_name]
+
+
+def _monthly_series(df, column, key):
+    """Month/value pairs for a kpi_monthly column, skipping blank rows."""
+    data = []
+    for index, row in df.iterrows():
+        if pd.notna(row['Month']) and pd.notna(row[column]):
+            data.append({
+                'month': str(row['Month']).strip(),  # Keep full format like "Jul 2024"
+                key: float(row[column])
+            })
+    return data
+
+
+def build_gwp_growth_trend(sheets):
+    """GWP Growth Trend data for the D3.js chart"""
+    df = _sheet(sheets, 'kpi_monthly')
+    return _monthly_series(df, '1.2a GWP Monthly M SAR', 'gwp_value'), 200
+
+
+def build_funnel_size_trend(sheets):
+    """Funnel Size Trend data for the D3.js line chart"""
+    df = _sheet(sheets, 'kpi_monthly')
+    return _monthly_series(df, '3.1 Funnel Size Count', 'funnel_count'), 200
+
+
+def build_funnel_coverage(sheets):
+    """Funnel Coverage data - monthly coverage percentages"""
+    df = _sheet(sheets, 'kpi_monthly')
+    return _monthly_series(df, '3.2 Funnel Coverage Pct', 'coverage_pct'), 200
+
+
+def build_budget_fit_analysis(sheets):
+    """Budget Fit Analysis data - averaged values across all months"""
+    df = _sheet(sheets, 'suhail_signals')
+
+    # Check if required columns exist
+    required_columns = ['3.4.1_Budget_Fit_Pct', '3.4.2_Proposal_Diversity_Pct', '3.4.3_Competitor_WinRate_Pct']
+    missing_columns = [col for col in required_columns if col not in df.columns]
+
+    if missing_columns:
+        print(f"Missing columns in suhail_signals sheet: {missing_columns}")
+        print(f"Available columns: {list(df.columns)}")
+        return [], 200
+
+    # Calculate averages across all months for each metric
+    budget_fit_avg = df['3.4.1_Budget_Fit_Pct'].dropna().mean()
+    proposal_diversity_avg = df['3.4.2_Proposal_Diversity_Pct'].dropna().mean()
+    competitor_winrate_avg = df['3.4.3_Competitor_WinRate_Pct'].dropna().mean()
+
+    return [
+        {
+            'metric': 'Budget Fit Analysis',
+            'percentage': round(budget_fit_avg, 1) if not pd.isna(budget_fit_avg) else 0
+        },
+        {
+            'metric': 'Proposal Diversity',
+            'percentage': round(proposal_diversity_avg, 1) if not pd.isna(proposal_diversity_avg) else 0
+        },
+        {
+            'metric': 'Competitor Win/Loss',
+            'percentage': round(competitor_winrate_avg, 1) if not pd.isna(competitor_winrate_avg) else 0
+        }
+    ], 200
+
+
+def _performance_pie(df, column, achieved_color, remaining_label):
+    """Pie chart data (achieved vs remaining) from a targets_monthly percentage column."""
+    # Check if required columns exist
+    if 'Month' not in df.columns or column not in df.columns:
+        print(f"Available columns in targets_monthly sheet: {list(df.columns)}")
+        return {'error': 'Required columns not found'}, 404
+
+    # Get the first non-null performance percentage (since it's consistent across months)
+    performance_pct = None
+    for index, row in df.iterrows():
+        if pd.notna(row[column]):
+            performance_pct = float(row[column])
+            break
+
+    if performance_pct is None:
+        return {'error': 'No valid performance data found'}, 404
+
+    # Create pie chart data - performance vs remaining
+    remaining_pct = 100 - performance_pct
+
+    return {
+        'performance_pct': round(performance_pct, 1),
+        'remaining_pct': round(remaining_pct, 1),
+        'data': [
+            {
+                'label': 'Achieved',
+                'value': round(performance_pct, 1),
+                'color': achieved_color
+            },
+            {
+                'label': remaining_label,
+                'value': round(remaining_pct, 1),
+                'color': '#6b7280'  # gray-500
+            }
+        ]
+    }, 200
+
+
+def build_renewals_performance(sheets):
+    """Renewals Performance data - pie chart data"""
+    df = _sheet(sheets, 'targets_monthly')
+    return _performance_pie(df, 'Renewals_Performance_Pct', '#10b981', 'Remaining')  # emerald-500
+
+
+def build_new_business_performance(sheets):
+    """New Business Performance data - pie chart data"""
+    df = _sheet(sheets, 'targets_monthly')
+    # violet-500 (different color from renewals)
+    return _performance_pie(df, 'NB_Performance_Pct', '#8b5cf6', 'Gap To Target')
+
+
+def build_overall_renewal_probability(sheets):
+    """Overall Renewal Probability data - line chart data"""
+    df = _sheet(sheets, 'kpi_monthly')
+
+    # Check if required columns exist
+    if 'Month' not in df.columns or '2.3 Overall Renewal Probability Pct' not in df.columns:
+        print(f"Available columns in kpi_monthly sheet: {list(df.columns)}")
+        return {'error': 'Required columns not found'}, 404
+
+    return _monthly_series(df, '2.3 Overall Renewal Probability Pct', 'probability_pct'), 200
+
+
+def build_competitor_overview(sheets):
+    """Competitor Overview data - average win rates by competitor"""
+    df = _sheet(sheets, 'competitor_outcomes')
+
+    # Check if required columns exist
+    required_columns = ['Month', 'Competitor', 'Win_Rate_Pct']
+    missing_columns = [col for col in required_columns if col not in df.columns]
+
+    if missing_columns:
+        print(f"Missing columns in competitor_outcomes sheet: {missing_columns}")
+        print(f"Available columns: {list(df.columns)}")
+        return {'error': f'Required columns not found: {missing_columns}'}, 404
+
+    # Group by Competitor and calculate average win rate
+    competitor_averages = df.groupby('Competitor')['Win_Rate_Pct'].mean().round(1)
+
+    # Convert to list of dictionaries for the chart
+    data = []
+    for competitor, avg_win_rate in competitor_averages.items():
+        if pd.notna(avg_win_rate):  # Only include non-null values
+            if competitor != 'Tawuniya':
+                # Exclude Tawuniya as per requirements
+                data.append({
+                    'competitor': str(competitor).strip(),
+                    'avg_win_rate': float(avg_win_rate)
+                })
+
+    # Sort by win rate descending for better visualization
+    data.sort(key=lambda x: x['avg_win_rate'], reverse=True)
+    return data, 200
+
+
+def build_renewal_heatmap(sheets):
+    """Renewal Heat Map data for the D3.js heatmap visualization"""
+    df = _sheet(sheets, 'heatmap_monthly')
+
+    data = []
+    for index, row in df.iterrows():
+        if pd.notna(row['Month']) and pd.notna(row['Bucket_Days']) and pd.notna(row['2.2_Renewal_Value_M_SAR']):
+            data.append({
+                'month': str(row['Month']).strip(),
+                'bucket_days': int(row['Bucket_Days']),
+                'renewal_value': float(row['2.2_Renewal_Value_M_SAR'])
+            })
+    return data, 200
+
+
+# Chart name (same as the /api/sme/<name> route) -> builder
+SME_CHARTS = {
+    'gwp-growth-trend': build_gwp_growth_trend,
+    'funnel-size-trend': build_funnel_size_trend,
+    'funnel-coverage': build_funnel_coverage,
+    'budget-fit-analysis': build_budget_fit_analysis,
+    'renewals-performance': build_renewals_performance,
+    'new-business-performance': build_new_business_performance,
+    'overall-renewal-probability': build_overall_renewal_probability,
+    'competitor-overview': build_competitor_overview,
+    'renewal-heatmap': build_renewal_heatmap,
+}
+
+# (workbook signature, chart name) -> (payload, status). Only the current signature is kept.
+_chart_cache = {}
+_chart_cache_lock = threading.Lock()
+
+
+def _compute_charts(names):
+    """(workbook signature, {name: (payload, status) or the exception its builder raised})."""
+    signature, sheets = load_sme_workbook()
+    results = {}
+    with _chart_cache_lock:
+        if any(key[0] != signature for key in _chart_cache):
+            _chart_cache.clear()
+        for name in names:
+            key = (signature, name)
+            if key not in _chart_cache:
+                try:
+                    _chart_cache[key] = SME_CHARTS[name](sheets)
+                except Exception as e:
+                    # Not cached: the next request retries this chart
+                    results[name] = e
+                    continue
+            results[name] = _chart_cache[key]
+    return signature, results
+
+
+def get_sme_chart(name):
+    """Return (payload, status) for one chart, computed once per workbook version."""
+    result = _compute_charts([name])[1][name]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def get_sme_charts(names):
+    """
+    Return (workbook signature, {name: (payload, status)}) for the requested charts.
+
+    All charts are computed from a single load of the workbook and memoized until the
+    file changes. A chart whose builder fails gets an {'error': ...} payload with status
+    500, like its own endpoint, instead of failing the others; errors loading the
+    workbook itself (e.g. FileNotFoundError) are raised.
+    """
+    signature, results = _compute_charts(names)
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            print(f"Error building SME chart {name}: {result}")
+            traceback.print_exception(result)
+            results[name] = ({'error': f'Failed to load {name} data: {result}'}, 500)
+    return signature, results
@@ -0,0 +1,42 @@
+import os
+import threading
+
+import pandas as pd
+
+SME_WORKBOOK_PATH = 'sme.xlsx'
+
+# path -> (signature, {sheet_name: DataFrame}). The whole workbook is parsed in one pass
+# and kept until the file's mtime or size changes.
+_workbooks = {}
+_workbook_lock = threading.Lock()
+
+
+def _file_signature(path):
+    stat = os.stat(path)  # raises FileNotFoundError, which the routes already handle
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def load_sme_workbook(path=SME_WORKBOOK_PATH):
+    """
+    Return (signature, {sheet_name: DataFrame}) for the SME workbook.
+
+    The signature changes whenever the file does, so callers can key derived data
+    (and HTTP ETags) on it. The DataFrames are shared between requests and must be
+    treated as read-only.
+    """
+    signature = _file_signature(path)
+    cached = _workbooks.get(path)
+    if cached and cached[0] == signature:
+        return cached
+
+    with _workbook_lock:
+        # Another request may have reloaded the file while we waited for the lock
+        signature = _file_signature(path)
+        cached = _workbooks.get(path)
+        if not cached or cached[0] != signature:
+            sheets = pd.read_excel(path, sheet_name=None)
+            cached = (signature, sheets)
+            _workbooks[path] = cached
+            print(f"Loaded SME workbook {path} ({len(sheets)} sheets)")
+        return cached
+
@@ -1,5 +1,8 @@
 from models import User, ChatSession, db
-from sqlalchemy import func
+from sqlalchemy import func, and_
+
+# Separator for group_concat'd client names; a control character can't clash with real names
+CLIENT_NAME_SEPARATOR = '\x1f'
 
 def get_total_sellers():
     """Get the total number of sales agents"""
@@ -25,25 +28,32 @@ def get_sales_agents_client_stats():
     - client_count
     - client_list
     """
-    sales_agents = User.query.filter_by(role='salesagent').all()
+    # Distinct (agent, client) pairs, then one row per agent with its clients concatenated
+    agent_clients = db.session.query(ChatSession.user_id, ChatSession.client_name)\
+        .filter(
+            ChatSession.client_name.isnot(None),
+            ChatSession.client_name != ''  # Exclude empty strings
+        )\
+        .distinct()\
+        .subquery()
+
+    rows = db.session.query(
+            User.username,
+            func.group_concat(agent_clients.c.client_name, CLIENT_NAME_SEPARATOR)
+        )\
+        .outerjoin(agent_clients, agent_clients.c.user_id == User.id)\
+        .filter(User.role == 'salesagent')\
+        .group_by(User.id)\
+        .order_by(User.id)\
+        .all()
+
     stats = []
-    
-    for agent in sales_agents:
-        # Get distinct client names for this agent
-        clients = db.session.query(ChatSession.client_name)\
-            .filter(
-                ChatSession.user_id == agent.id,
-                ChatSession.client_name.isnot(None),
-                ChatSession.client_name != ''  # Exclude empty strings
-            )\
-            .distinct()\
-            .all()
-        
-        # Convert list of tuples to list of names, filtering out any None or empty strings
-        client_names = [client[0] for client in clients if client[0] and client[0].strip()]
+    for username, clients in rows:
+        # Split back into names, filtering out any whitespace-only names
+        client_names = [name for name in (clients or '').split(CLIENT_NAME_SEPARATOR) if name and name.strip()]
         
         stats.append({
-            'agent_name': agent.username,
+            'agent_name': username,
             'client_count': len(client_names),
             'client_list': client_names
         })
@@ -91,7 +101,20 @@ def get_seller_productivity():
     Get productivity metrics for all sales agents with enhanced engagement metrics
     Returns a list of dictionaries containing detailed seller performance data
     """
-    sales_agents = User.query.filter_by(role='salesagent').all()
+    # Engaged (distinct, non-empty) client count per agent in a single query
+    engagement = db.session.query(
+            User.username,
+            func.count(func.distinct(ChatSession.client_name))
+        )\
+        .outerjoin(ChatSession, and_(
+            ChatSession.user_id == User.id,
+            ChatSession.client_name.isnot(None),
+            ChatSession.client_name != ''
+        ))\
+        .filter(User.role == 'salesagent')\
+        .group_by(User.id)\
+        .order_by(User.id)\
+        .all()
     productivity_data = []
     
     insights = [
@@ -105,14 +128,8 @@ def get_seller_productivity():
     
     import random
     
-    for agent in sales_agents:
-        # Get actual engaged clients count
-        engaged_clients = db.session.query(func.count(func.distinct(ChatSession.client_name)))\
-            .filter(
-                ChatSession.user_id == agent.id,
-                ChatSession.client_name.isnot(None),
-                ChatSession.client_name != ''
-            ).scalar() or 0
+    for username, engaged_clients in engagement:
+        engaged_clients = engaged_clients or 0
             
         # Generate realistic placeholder data
         closed_deals = random.randint(0, max(1, engaged_clients // 2))
@@ -122,7 +139,7 @@ def get_seller_productivity():
         engaged_opportunities = random.randint(max(1, engaged_clients // 2), engaged_clients + 3)
         
         productivity_data.append({
-            'seller_name': agent.username,
+            'seller_name': username,
             'engaged_clients': engaged_clients,
             'win_probability': f"{win_probability * 100:.1f}%",
             'closed_deals': closed_deals,
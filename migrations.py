@@ -0,0 +1,140 @@
+# migrations.py
+#
+# Lightweight, idempotent schema migrations for users.db. Each migration runs once and is
+# recorded in the schema_migrations table; run_migrations() is safe to call on every
+# startup, after db.create_all().
+
+from datetime import datetime
+
+from models import db
+
+
+def _column_names(conn, table):
+    return [row[1] for row in conn.execute(db.text(f"PRAGMA table_info('{table}')"))]
+
+
+def _add_user_manager_id(conn):
+    if 'manager_id' not in _column_names(conn, 'user'):
+        conn.execute(db.text("ALTER TABLE user ADD COLUMN manager_id INTEGER"))
+
+
+def dedupe_notification_reads(conn):
+    """Keep only the earliest read receipt per (user, notification). Returns rows removed."""
+    result = conn.execute(db.text("""
+        DELETE FROM notification_reads
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM notification_reads GROUP BY user_id, notification_id
+        )
+    """))
+    return result.rowcount
+
+
+def _add_filter_indexes(conn):
+    # Names match the __table_args__ in models.py, so fresh databases created by
+    # db.create_all() already have them and these statements are no-ops.
+    conn.execute(db.text(
+        "CREATE INDEX IF NOT EXISTS ix_chat_messages_session_id_timestamp "
+        "ON chat_messages (session_id, timestamp)"))
+    conn.execute(db.text(
+        "CREATE INDEX IF NOT EXISTS ix_chat_sessions_user_id_client_name "
+        "ON chat_sessions (user_id, client_name)"))
+    conn.execute(db.text(
+        "CREATE INDEX IF NOT EXISTS ix_client_summaries_user_id_client_name "
+        "ON client_summaries (user_id, client_name)"))
+    conn.execute(db.text(
+        "CREATE INDEX IF NOT EXISTS ix_transcript_user_id_created_at "
+        "ON transcript (user_id, created_at)"))
+
+    # Duplicate read receipts would make the unique index fail to build
+    removed = dedupe_notification_reads(conn)
+    if removed:
+        print(f"Removed {removed} duplicate notification_reads rows")
+    conn.execute(db.text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_notification_reads_user_id_notification_id "
+        "ON notification_reads (user_id, notification_id)"))
+
+
+def _add_chat_sessions_created_at_index(conn):
+    # Keyset pagination of a user's chat list walks (user_id, created_at, id); id is a
+    # text primary key, so it has to be in the index for the tie-break order
+    conn.execute(db.text(
+        "CREATE INDEX IF NOT EXISTS ix_chat_sessions_user_id_created_at_id "
+        "ON chat_sessions (user_id, created_at, id)"))
+
+
+# (version, name, function) in the order they must be applied. Never renumber or remove.
+MIGRATIONS = [
+    (1, 'add user.manager_id', _add_user_manager_id),
+    (2, 'add filter indexes and unique notification reads', _add_filter_indexes),
+    (3, 'add chat_sessions (user_id, created_at, id) index', _add_chat_sessions_created_at_index),
+]
+
+
+def run_migrations(engine=None):
+    """Apply pending migrations in order. Returns the versions applied by this call."""
+    engine = engine or db.engine
+    applied_now = []
+    with engine.begin() as conn:
+        conn.execute(db.text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_at DATETIME NOT NULL
+            )
+        """))
+        applied = {row[0] for row in conn.execute(db.text("SELECT version FROM schema_migrations"))}
+
+    for version, name, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        # One transaction per migration so a failure leaves earlier ones recorded
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                db.text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {'v': version, 'n': name, 't': datetime.utcnow()}
+            )
+        print(f"Applied migration {version}: {name}")
+        applied_now.append(version)
+    return applied_now
+
+
+# Hot queries and the index each one is expected to use
+QUERY_PLAN_CHECKS = [
+    ('load_chat',
+     "SELECT * FROM chat_messages WHERE session_id = 'x' AND (timestamp, id) < ('2030-01-01', 1) "
+     "ORDER BY timestamp DESC, id DESC LIMIT 31",
+     'ix_chat_messages_session_id_timestamp'),
+    ('get_user_chats',
+     "SELECT * FROM chat_sessions WHERE user_id = 1 AND (created_at, id) < ('2030-01-01', 'x') "
+     "ORDER BY created_at DESC, id DESC LIMIT 51",
+     'ix_chat_sessions_user_id_created_at_id'),
+    ('get_clients',
+     "SELECT DISTINCT client_name FROM chat_sessions WHERE user_id = 1 AND client_name IS NOT NULL",
+     'ix_chat_sessions_user_id_client_name'),
+    ('client summary lookup',
+     "SELECT * FROM client_summaries WHERE user_id = 1 AND client_name = 'x'",
+     'ix_client_summaries_user_id_client_name'),
+    ('unread notifications',
+     "SELECT notification_id FROM notification_reads WHERE user_id = 1",
+     'uq_notification_reads_user_id_notification_id'),
+    ('list_transcripts',
+     "SELECT * FROM transcript WHERE user_id = 1 AND (created_at, id) < ('2030-01-01', 1) "
+     "ORDER BY created_at DESC, id DESC LIMIT 51",
+     'ix_transcript_user_id_created_at'),
+]
+
+
+def check_query_plans(engine=None):
+    """
+    Run EXPLAIN QUERY PLAN for the hot queries.
+
+    Returns a list of (name, expected index, plan text, uses index) tuples.
+    """
+    engine = engine or db.engine
+    results = []
+    with engine.connect() as conn:
+        for name, sql, index_name in QUERY_PLAN_CHECKS:
+            plan = ' | '.join(row[-1] for row in conn.execute(db.text(f"EXPLAIN QUERY PLAN {sql}")))
+            results.append((name, index_name, plan, index_name in plan))
+    return results
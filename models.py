@@ -51,6 +51,10 @@ class User(UserMixin, db.Model):
 
 class ChatSession(db.Model):
     __tablename__ = 'chat_sessions'
+    __table_args__ = (
+        db.Index('ix_chat_sessions_user_id_client_name', 'user_id', 'client_name'),
+        db.Index('ix_chat_sessions_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.Integer, nullable=False)
     title = db.Column(db.String(100), default='Untitled Chat')
@@ -59,6 +63,9 @@ class ChatSession(db.Model):
     
 class ChatMessage(db.Model):
     __tablename__ = 'chat_messages'
+    __table_args__ = (
+        db.Index('ix_chat_messages_session_id_timestamp', 'session_id', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(36), db.ForeignKey('chat_sessions.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -70,6 +77,9 @@ class ChatMessage(db.Model):
 
 class ClientSummary(db.Model):
     __tablename__ = 'client_summaries'
+    __table_args__ = (
+        db.Index('ix_client_summaries_user_id_client_name', 'user_id', 'client_name'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     client_name = db.Column(db.String(100), nullable=False)
@@ -93,6 +103,10 @@ class TeamNotification(db.Model):
 
 class NotificationRead(db.Model):
     __tablename__ = 'notification_reads'
+    __table_args__ = (
+        # One read receipt per user and notification
+        db.Index('uq_notification_reads_user_id_notification_id', 'user_id', 'notification_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     notification_id = db.Column(db.Integer, db.ForeignKey('team_notifications.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -103,6 +117,9 @@ class NotificationRead(db.Model):
 
 class Transcript(db.Model):
     __tablename__ = 'transcript'
+    __table_args__ = (
+        db.Index('ix_transcript_user_id_created_at', 'user_id', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     chat_id = db.Column(db.String, db.ForeignKey('chat_sessions.id'), nullable=True)
@@ -116,4 +133,21 @@ class Transcript(db.Model):
     language = db.Column(db.String(16), nullable=True)
 
     user = db.relationship('User', backref='transcripts')
-    chat = db.relationship('ChatSession', backref='transcripts')
\ No newline at end of file
+    chat = db.relationship('ChatSession', backref='transcripts')
+
+class TranscriptionJob(db.Model):
+    __tablename__ = 'transcription_jobs'
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    title = db.Column(db.String(255), nullable=False, default='Untitled Meeting')
+    audio_path = db.Column(db.String, nullable=False)  # uploaded audio, removed once the job finishes
+    status = db.Column(db.String(20), nullable=False, default='queued')  # 'queued', 'running', 'completed', 'failed'
+    stage = db.Column(db.String(50), nullable=True)  # current pipeline stage while running
+    progress = db.Column(db.Integer, default=0)  # 0-100
+    error = db.Column(db.Text, nullable=True)
+    transcript_id = db.Column(db.Integer, db.ForeignKey('transcript.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    transcript = db.relationship('Transcript')
+
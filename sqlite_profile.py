@@ -0,0 +1,65 @@
+# sqlite_profile.py
+#
+# SQLite performance profile applied to every connection we open: the Flask-SQLAlchemy
+# engine for users.db and the LangGraph checkpointer connections for suhail_database.db.
+#
+# SQLITE_PROFILE selects a profile ("performance" by default, "default" leaves SQLite's
+# own settings alone). Individual pragmas can be overridden with SQLITE_<PRAGMA>, e.g.
+# SQLITE_BUSY_TIMEOUT=10000 or SQLITE_SYNCHRONOUS=FULL.
+
+import os
+import sqlite3
+
+from sqlalchemy import event
+
+SQLITE_PROFILES = {
+    'performance': {
+        'journal_mode': 'WAL',        # readers no longer block the writer
+        'synchronous': 'NORMAL',      # safe with WAL, far fewer fsyncs
+        'busy_timeout': 5000,         # ms to wait on a lock instead of "database is locked"
+        'cache_size': -64000,         # negative = KiB, i.e. 64 MB page cache
+        'mmap_size': 268435456,       # 256 MB memory-mapped I/O
+        'temp_store': 'MEMORY',
+    },
+    'default': {},
+}
+
+
+def get_sqlite_pragmas():
+    """Pragmas for the configured profile, with per-pragma environment overrides applied."""
+    profile = os.getenv('SQLITE_PROFILE', 'performance')
+    pragmas = dict(SQLITE_PROFILES.get(profile, SQLITE_PROFILES['performance']))
+    for name in SQLITE_PROFILES['performance']:
+        override = os.getenv(f'SQLITE_{name.upper()}')
+        if override:
+            pragmas[name] = override
+    return pragmas
+
+
+def apply_sqlite_pragmas(dbapi_connection):
+    """Apply the profile to a raw sqlite3 connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in get_sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def install_sqlite_pragmas(engine):
+    """Apply the profile to every new connection of a SQLAlchemy engine (SQLite only)."""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection)
+
+
+def connect_sqlite(path, **kwargs):
+    """sqlite3.connect with the profile applied; extra kwargs go to sqlite3.connect."""
+    busy_timeout_ms = int(get_sqlite_pragmas().get('busy_timeout', 5000))
+    kwargs.setdefault('timeout', busy_timeout_ms / 1000)
+    conn = sqlite3.connect(path, **kwargs)
+    apply_sqlite_pragmas(conn)
+    return conn
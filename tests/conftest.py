@@ -0,0 +1,37 @@
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from models import db
+
+
+@pytest.fixture
+def app():
+    """Minimal Flask app with the models on a fresh in-memory SQLite database."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def count_queries(app):
+    """count_queries(fn) -> (result, number of SQL statements fn executed)."""
+    def count(fn):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            result = fn()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        return result, len(statements)
+
+    return count
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import func
+
+from dashboard.stats import get_sales_agents_client_stats, get_seller_productivity
+from models import db, ChatSession, User
+
+
+def seed(agent_count):
+    """A manager plus `agent_count` sales agents with duplicate, empty and missing client names."""
+    db.session.add(User(id=1, username='manager', password_hash='x', role='manager'))
+    for i in range(2, agent_count + 2):
+        db.session.add(User(id=i, username=f'agent{i}', password_hash='x', role='salesagent', manager_id=1))
+        clients = [f'Client {i}', 'Acme, Inc.', 'Acme, Inc.', '', None] if i % 3 else []
+        for n, client in enumerate(clients):
+            db.session.add(ChatSession(id=f'{i}-{n}', user_id=i, client_name=client))
+    db.session.commit()
+
+
+def per_agent_client_stats():
+    """get_sales_agents_client_stats as it was before, with one query per agent."""
+    stats = []
+    for agent in User.query.filter_by(role='salesagent').all():
+        clients = db.session.query(ChatSession.client_name).filter(
+            ChatSession.user_id == agent.id,
+            ChatSession.client_name.isnot(None),
+            ChatSession.client_name != ''
+        ).distinct().all()
+        client_names = [client[0] for client in clients if client[0] and client[0].strip()]
+        stats.append({'agent_name': agent.username, 'client_count': len(client_names), 'client_list': client_names})
+    return stats
+
+
+def per_agent_engaged_clients():
+    """Engaged-client counts as get_seller_productivity computed them before."""
+    return [
+        (agent.username, db.session.query(func.count(func.distinct(ChatSession.client_name))).filter(
+            ChatSession.user_id == agent.id,
+            ChatSession.client_name.isnot(None),
+            ChatSession.client_name != ''
+        ).scalar() or 0)
+        for agent in User.query.filter_by(role='salesagent').all()
+    ]
+
+
+@pytest.mark.parametrize('stats_function', [get_sales_agents_client_stats, get_seller_productivity])
+def test_query_count_does_not_grow_with_agents(app, count_queries, stats_function):
+    seed(2)
+    _, few = count_queries(stats_function)
+    db.session.query(ChatSession).delete()
+    db.session.query(User).delete()
+    seed(50)
+    result, many = count_queries(stats_function)
+
+    assert len(result) == 50
+    assert few == many == 1
+
+
+def test_client_stats_match_per_agent_queries(app):
+    seed(50)
+    stats = get_sales_agents_client_stats()
+    expected = per_agent_client_stats()
+
+    assert [s['agent_name'] for s in stats] == [e['agent_name'] for e in expected]
+    for row, old in zip(stats, expected):
+        assert set(row) == {'agent_name', 'client_count', 'client_list'}
+        assert row['client_count'] == old['client_count']
+        assert sorted(row['client_list']) == sorted(old['client_list'])
+
+
+def test_seller_productivity_matches_per_agent_queries(app):
+    seed(50)
+    productivity = get_seller_productivity()
+
+    assert [(p['seller_name'], p['engaged_clients']) for p in productivity] == per_agent_engaged_clients()
+    assert all(set(p) == {
+        'seller_name', 'engaged_clients', 'win_probability', 'closed_deals', 'win_ratio',
+        'sales_pipeline', 'engaged_opportunities', 'general_insights'
+    } for p in productivity)
@@ -0,0 +1,112 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+from migrations import MIGRATIONS, QUERY_PLAN_CHECKS, check_query_plans, run_migrations
+
+# users.db as it was before the migration runner: no user.manager_id, no secondary indexes
+PRE_INDEX_SCHEMA = [
+    """CREATE TABLE user (
+        id INTEGER NOT NULL PRIMARY KEY,
+        username VARCHAR(80) NOT NULL UNIQUE,
+        password_hash VARCHAR(1000) NOT NULL,
+        role VARCHAR(20) NOT NULL
+    )""",
+    """CREATE TABLE chat_sessions (
+        id VARCHAR(36) NOT NULL PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        title VARCHAR(100),
+        created_at DATETIME,
+        client_name VARCHAR(100)
+    )""",
+    """CREATE TABLE chat_messages (
+        id INTEGER NOT NULL PRIMARY KEY,
+        session_id VARCHAR(36) NOT NULL REFERENCES chat_sessions (id),
+        user_id INTEGER NOT NULL REFERENCES user (id),
+        message TEXT NOT NULL,
+        sender VARCHAR(10) NOT NULL,
+        timestamp DATETIME
+    )""",
+    """CREATE TABLE client_summaries (
+        id INTEGER NOT NULL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES user (id),
+        client_name VARCHAR(100) NOT NULL,
+        summary TEXT NOT NULL,
+        last_updated DATETIME,
+        message_count INTEGER
+    )""",
+    """CREATE TABLE team_notifications (
+        id INTEGER NOT NULL PRIMARY KEY,
+        manager_id INTEGER NOT NULL REFERENCES user (id),
+        message TEXT NOT NULL,
+        timestamp DATETIME,
+        is_active BOOLEAN,
+        priority VARCHAR(50)
+    )""",
+    """CREATE TABLE transcript (
+        id INTEGER NOT NULL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES user (id),
+        chat_id VARCHAR REFERENCES chat_sessions (id),
+        title VARCHAR(255) NOT NULL,
+        text TEXT NOT NULL,
+        created_at DATETIME,
+        file_path VARCHAR,
+        speakers_count INTEGER,
+        language VARCHAR(16)
+    )""",
+    """CREATE TABLE notification_reads (
+        id INTEGER NOT NULL PRIMARY KEY,
+        notification_id INTEGER NOT NULL REFERENCES team_notifications (id),
+        user_id INTEGER NOT NULL REFERENCES user (id),
+        read_at DATETIME
+    )""",
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A fresh users.db with the pre-index schema and a few duplicate read receipts."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    with engine.begin() as conn:
+        for statement in PRE_INDEX_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO user (id, username, password_hash, role) VALUES (1, 'a', 'x', 'salesagent')"))
+        conn.execute(text(
+            "INSERT INTO team_notifications (id, manager_id, message, is_active) VALUES (1, 1, 'm', 1), (2, 1, 'n', 1)"))
+        # A double click and two tabs, as the old mark-read endpoint recorded them
+        conn.execute(text(
+            "INSERT INTO notification_reads (notification_id, user_id) VALUES (1, 1), (1, 1), (2, 1), (1, 1)"))
+    yield engine
+    engine.dispose()
+
+
+def test_run_migrations_applies_everything_once(engine):
+    assert run_migrations(engine) == [version for version, _, _ in MIGRATIONS]
+    assert run_migrations(engine) == []
+
+    with engine.connect() as conn:
+        recorded = [row[0] for row in conn.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+        columns = [row[1] for row in conn.execute(text("PRAGMA table_info('user')"))]
+    assert recorded == [version for version, _, _ in MIGRATIONS]
+    assert 'manager_id' in columns
+
+
+def test_notification_reads_are_unique_after_migrating(engine):
+    run_migrations(engine)
+
+    with engine.connect() as conn:
+        receipts = conn.execute(text(
+            "SELECT notification_id, user_id FROM notification_reads ORDER BY notification_id")).all()
+        assert [tuple(r) for r in receipts] == [(1, 1), (2, 1)]
+        with pytest.raises(IntegrityError):
+            conn.execute(text("INSERT INTO notification_reads (notification_id, user_id) VALUES (1, 1)"))
+
+
+def test_hot_queries_use_their_indexes(engine):
+    run_migrations(engine)
+
+    results = check_query_plans(engine)
+
+    assert [name for name, _, _, _ in results] == [name for name, _, _ in QUERY_PLAN_CHECKS]
+    for name, index_name, plan, uses_index in results:
+        assert uses_index, f"{name} does not use {index_name}: {plan}"